@@ -0,0 +1,77 @@
+"""
+Сравнение памяти и скорости результата get_adv_info:
+список словарей ProductADV против AdvProducts
+
+Запуск: python -m benchmarks.bench_adv_products --rows 500000
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable
+
+from src.application.adv_products import SEARCH_PROMO_ADV_ID, AdvProducts
+
+FIRST_SKU = 1_500_000_000
+
+
+def build_pages(rows: int, campaigns: int) -> list[tuple[str, list[int]]]:
+    """
+    Страницы по 100 sku: кампании и продвижение в поиске поровну, кампании пересекаются наполовину
+    """
+    pages = []
+    per_source = rows // (campaigns + 1)
+    for source in range(campaigns + 1):
+        adv_id = SEARCH_PROMO_ADV_ID if source == campaigns else str(10_000_000 + source)
+        start = source * per_source // 2
+        skus = [FIRST_SKU + start + index for index in range(per_source)]
+        pages.extend((adv_id, skus[i:i + 100]) for i in range(0, len(skus), 100))
+    return pages
+
+
+def as_list(pages: list[tuple[str, list[int]]]) -> list[dict]:
+    return [{"sku": sku, "adv_id": adv_id} for adv_id, skus in pages for sku in skus]
+
+
+def as_adv_products(pages: list[tuple[str, list[int]]]) -> AdvProducts:
+    result = AdvProducts()
+    for adv_id, skus in pages:
+        result.extend(skus, adv_id)
+    return result
+
+
+def measure(name: str, build: Callable, pages: list, probes: list[int]) -> None:
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    result = build(pages)
+    build_s = time.perf_counter() - started_at
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started_at = time.perf_counter()
+    skus = result.skus if isinstance(result, AdvProducts) else {product["sku"] for product in result}
+    hits = sum(sku in skus for sku in probes)
+    lookup_s = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    rows = sum(1 for _ in result)
+    iterate_s = time.perf_counter() - started_at
+    print(
+        f"{name:>14}: rows {rows}, retained {retained / 1024 / 1024:7.2f} MB, build {build_s * 1000:7.1f} ms, "
+        f"set + {len(probes)} lookups {lookup_s * 1000:6.1f} ms ({hits} hits), iterate {iterate_s * 1000:6.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--campaigns", type=int, default=50)
+    args = parser.parse_args()
+
+    pages = build_pages(args.rows, args.campaigns)
+    probes = [FIRST_SKU + index * 7 for index in range(100_000)]
+    measure("list[dict]", as_list, pages, probes)
+    measure("AdvProducts", as_adv_products, pages, probes)
+
+
+if __name__ == "__main__":
+    main()
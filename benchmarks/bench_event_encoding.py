@@ -0,0 +1,43 @@
+"""
+Сравнение стоимости кодирования FoundZeroStockEvent:
+прежний json.dumps(asdict(event), indent=2) против EventSerializer
+
+Запуск: python -m benchmarks.bench_event_encoding
+"""
+import json
+import timeit
+from dataclasses import asdict
+
+from src.application.events import FoundZeroStockEvent
+from src.utils.serializers import EventSerializer
+
+NUMBER = 100_000
+
+
+def legacy_encode(event: FoundZeroStockEvent) -> bytes:
+    return json.dumps(asdict(event), indent=2).encode("utf-8")
+
+
+def main():
+    event = FoundZeroStockEvent(
+        sku=1234567890,
+        legal_entity="СтройОтделка",
+        adv_id="12345678",
+        adv_ids=["12345678", "23456789", "Продвижение в поиске"],
+    )
+    serializer = EventSerializer()
+    encoders = {"legacy": legacy_encode, "EventSerializer": serializer}
+    try:
+        import orjson
+    except ImportError:
+        pass
+    else:
+        encoders["EventSerializer(orjson)"] = EventSerializer(dumps=orjson.dumps)
+
+    for name, encode in encoders.items():
+        seconds = min(timeit.repeat(lambda: encode(event), number=NUMBER, repeat=3))
+        print(f"{name:>25}: {seconds / NUMBER * 1e6:6.2f} µs/event, {len(encode(event))} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Бюджет времени импорта для холодного старта функции
+
+Импортирует модуль в отдельном интерпретаторе с -X importtime,
+печатает самые тяжёлые импорты и завершается с кодом 1, если суммарное время превысило порог.
+
+Запуск: python -m benchmarks.bench_import_time [--module main] [--threshold-ms 300] [--top 15]
+"""
+import argparse
+import subprocess
+import sys
+
+
+def measure(module: str) -> dict[str, tuple[int, int]]:
+    """
+    Возвращает {модуль: (собственное время, накопленное время)} в микросекундах
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    result = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        result[name.strip()] = (int(self_us), int(cumulative_us))
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--threshold-ms", type=float, default=300)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings = measure(args.module)
+    total_ms = timings[args.module][1] / 1000
+    for name, (_, cumulative) in sorted(timings.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"{cumulative / 1000:9.1f} ms  {name}")
+    print(f"import {args.module}: {total_ms:.1f} ms (threshold {args.threshold_ms:.0f} ms)")
+    if total_ms > args.threshold_ms:
+        print("import time budget exceeded")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
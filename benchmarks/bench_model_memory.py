@@ -0,0 +1,109 @@
+"""
+Замер памяти доменных объектов каталога через tracemalloc:
+прежние Sku/Sale/Product с __dict__ и ссылкой продажи на товар против
+слотовых Sku (общих через Sku.intern), Sale и Product из src.application.model
+
+Запуск: python -m benchmarks.bench_model_memory --products 10000 --sales 100
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from src.application.model import Product, Sale, Sku
+
+START = datetime(2025, 1, 1)
+
+
+@dataclass
+class LegacySku:
+    id: int | None
+    vendor_code: str
+    sku: str
+    marketplace: str
+
+
+@dataclass
+class LegacySale:
+    quantity: int
+    date: datetime
+    product_id: int
+    in_stock: int
+    product: Any
+
+
+class LegacyProduct:
+    def __init__(self, id, sku, name, url, seller, stock_fbo, stock_fbs, sales):
+        self.id = id
+        self.sku = sku
+        self.name = name
+        self.url = url
+        self.seller = seller
+        self._status = ""
+        self.stock_fbo = stock_fbo
+        self.stock_fbs = stock_fbs
+        self.pre_replenishment_inventory = stock_fbo + stock_fbs
+        self.sales = sales
+        self.events = []
+
+
+def build_legacy(products: int, sales: int, dates: list[datetime]) -> list:
+    result = []
+    for index in range(products):
+        product = LegacyProduct(
+            index, LegacySku(index, f"V-{index}", str(100_000_000 + index), "ozon"),
+            f"Товар {index}", "", "amodecor", 10, 0, [],
+        )
+        # Продажи каждого товара и раньше ссылались на свой экземпляр артикула через товар
+        product.sales = [LegacySale(day % 5, dates[day], index, 1, product) for day in range(sales)]
+        result.append(product)
+    return result
+
+
+def build_slotted(products: int, sales: int, dates: list[datetime]) -> list:
+    return [
+        Product(
+            id=index,
+            sku=Sku.intern(id=index, vendor_code=f"V-{index}", sku=str(100_000_000 + index), marketplace="ozon"),
+            name=f"Товар {index}",
+            url="",
+            seller="amodecor",
+            stock_fbo=10,
+            stock_fbs=0,
+            sales=[Sale(quantity=day % 5, date=dates[day], product_id=index, in_stock=1) for day in range(sales)],
+        )
+        for index in range(products)
+    ]
+
+
+def measure(name: str, build: Callable[[], list]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started_at
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{name:>8}: {size / 1024 / 1024:8.1f} MB, build {elapsed:6.2f} s, {len(result)} products")
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--sales", type=int, default=100)
+    args = parser.parse_args()
+    # Даты общие для обоих вариантов, чтобы сравнивались только сами объекты
+    dates = [START + timedelta(days=day) for day in range(args.sales)]
+
+    legacy = measure("legacy", lambda: build_legacy(args.products, args.sales, dates))
+    slotted = measure("slotted", lambda: build_slotted(args.products, args.sales, dates))
+    print(f"reduction: {(1 - slotted / legacy) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
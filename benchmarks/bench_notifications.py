@@ -0,0 +1,90 @@
+"""
+Замер проверки порогов уведомлений о низком остатке по всему каталогу:
+Notification.check_and_send_notification по одному товару против пакетной
+Notification.check_and_send_notifications и классификации готовой таблицы StockFigures
+
+Запуск: python -m benchmarks.bench_notifications --products 100000 --days 30
+"""
+import argparse
+import gc
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+
+from src.application.model import Notification, Product, ProductStatus, Sale, Sku, StockFigures
+
+STATUSES = [ProductStatus.ORDINARY, ProductStatus.NEW, ProductStatus.ABSOLUTE_NEW]
+SENT_STATUSES = ["", "sent_12", "sent_6", "sent_3"]
+
+
+def build_items(count: int, days: int, now: datetime, seed: int = 0) -> list[tuple[Notification, Product]]:
+    rnd = random.Random(seed)
+    items = []
+    for index in range(count):
+        sku = Sku(id=index, vendor_code=f"V-{index}", sku=str(100_000_000 + index), marketplace="ozon")
+        sales = [
+            Sale(
+                quantity=rnd.randint(0, 5),
+                date=(now - timedelta(days=day)).replace(hour=0, minute=0, second=0, microsecond=0),
+                product_id=index,
+                in_stock=int(rnd.random() < 0.8),
+            )
+            for day in range(days)
+        ]
+        product = Product(
+            id=index,
+            sku=sku,
+            name=f"Товар {index}",
+            url="",
+            seller="amodecor",
+            stock_fbo=rnd.randint(0, 40),
+            stock_fbs=rnd.randint(0, 20),
+            sales=sales,
+            _status=rnd.choice(STATUSES).value,
+            pre_replenishment_inventory=rnd.randint(0, 500),
+        )
+        items.append((Notification(rnd.choice(SENT_STATUSES), sku), product))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+    now = datetime.utcnow()
+
+    items = build_items(args.products, args.days, now)
+    for _, product in items:
+        # История продаж строится при загрузке товара, в замер не входит
+        product.sales_history
+    # Первая полная сборка мусора по только что загруженному каталогу - тоже часть загрузки
+    gc.collect()
+    started_at = time.perf_counter()
+    sent = sum(notification.check_and_send_notification(product) for notification, product in items)
+    print(f"{'one by one':>22}: {time.perf_counter() - started_at:7.3f} s, {sent} notifications")
+
+    items = build_items(args.products, args.days, now)
+    for _, product in items:
+        product.sales_history
+    gc.collect()
+    started_at = time.perf_counter()
+    notifications = Notification.check_and_send_notifications(items, now=now)
+    print(f"{'batch':>22}: {time.perf_counter() - started_at:7.3f} s, {len(notifications)} notifications")
+
+    rnd = random.Random(1)
+    figures = StockFigures(
+        statuses=[rnd.choice(STATUSES) for _ in range(args.products)],
+        stocks=array("q", [rnd.randint(0, 60) for _ in range(args.products)]),
+        pre_replenishment_inventory=array("q", [rnd.randint(0, 500) for _ in range(args.products)]),
+        sales=array("q", [rnd.randint(0, 300) for _ in range(args.products)]),
+        sent_statuses=[rnd.choice(SENT_STATUSES) for _ in range(args.products)],
+    )
+    started_at = time.perf_counter()
+    rows = figures.classify()
+    print(f"{'StockFigures.classify':>22}: {time.perf_counter() - started_at:7.3f} s, {len(rows)} rows")
+
+
+if __name__ == "__main__":
+    main()
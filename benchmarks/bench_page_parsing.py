@@ -0,0 +1,68 @@
+"""
+Сравнение разбора страниц товаров рекламной кампании:
+полное декодирование json.loads / orjson.loads против PageProjection("sku")
+
+Время - на одну страницу, память - удерживаемая после разбора PAGES страниц
+(как при сборе рекламируемых товаров всех кампаний)
+
+Запуск: python -m benchmarks.bench_page_parsing
+"""
+import json
+import timeit
+import tracemalloc
+from typing import Any, Callable
+
+from src.adapters.marketplaces.ozon import ADV_PAGE_SIZE
+from src.adapters.parsers import PageProjection
+
+NUMBER = 2000
+PAGES = 1000
+
+
+def build_page(page: int) -> bytes:
+    # Строка товара в ответе /api/client/campaign/{id}/v2/products
+    products = [
+        {
+            "sku": str(100_000_000 + page * ADV_PAGE_SIZE + index),
+            "bid": "12000000",
+            "bidPrice": "12",
+            "title": f"Панель стеновая ПВХ {page}-{index}, 2700x250 мм",
+            "imageUrl": f"https://cdn1.ozone.ru/s3/multimedia-{index}/{page}.jpg",
+            "stats": {"views": str(index * 7), "clicks": str(index), "orders": "0"},
+        }
+        for index in range(ADV_PAGE_SIZE)
+    ]
+    return json.dumps({"products": products, "total": str(PAGES * ADV_PAGE_SIZE)}, ensure_ascii=False).encode()
+
+
+def retained_mb(parse: Callable[[bytes], Any], pages: list[bytes]) -> float:
+    tracemalloc.start()
+    result = [parse(body)["products"] for body in pages]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size / 1024 / 1024
+
+
+def main():
+    pages = [build_page(page) for page in range(PAGES)]
+    parsers: dict[str, Callable[[bytes], Any]] = {"json.loads": json.loads}
+    try:
+        import orjson
+    except ImportError:
+        pass
+    else:
+        parsers["orjson.loads"] = orjson.loads
+    parsers["PageProjection(sku)"] = PageProjection("sku", int)
+
+    print(f"page: {len(pages[0])} bytes, {ADV_PAGE_SIZE} products")
+    for name, parse in parsers.items():
+        seconds = min(timeit.repeat(lambda: parse(pages[0]), number=NUMBER, repeat=3))
+        print(
+            f"{name:>20}: {seconds / NUMBER * 1e6:8.1f} µs/page, "
+            f"retained {retained_mb(parse, pages):6.2f} MB for {PAGES} pages"
+        )
+
+
+if __name__ == "__main__":
+    main()
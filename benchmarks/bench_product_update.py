@@ -0,0 +1,94 @@
+"""
+Замер ежедневного обновления продаж Product.update на товарах с историей от 1 до 5 лет:
+прежнее слияние через пересоздаваемый словарь против постоянного индекса по дате
+
+Каждое обновление - новый день и уточнение двух предыдущих дней,
+после него запрашиваются продажи за 30 дней, как при проверке уведомлений
+
+Запуск: python -m benchmarks.bench_product_update --products 200 --updates 30
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from src.application.model import Product, Sale, Sku
+
+START = datetime(2021, 1, 1)
+
+
+def legacy_update(product: Product, data: SimpleNamespace):
+    """
+    Слияние продаж в Product.update до постоянного индекса
+    (ключ по sku товара, так как у продаж больше нет ссылки на товар)
+    """
+    sales_dict = {(product.sku.sku, sale.date): sale for sale in product.sales}
+    for sl_data in data.sales:
+        key = (data.sku.sku, sl_data.date)
+        if key in sales_dict:
+            sales_dict[key].update(sl_data, product.id)
+        else:
+            new_sale = Sale(
+                quantity=sl_data.quantity, date=sl_data.date, product_id=product.id, in_stock=sl_data.in_stock,
+            )
+            sales_dict[key] = new_sale
+            product.sales.append(new_sale)
+    product.sales = list(sales_dict.values())
+
+
+def build_product(index: int, years: int, rnd: random.Random) -> Product:
+    sku = Sku(id=index, vendor_code=f"V-{index}", sku=str(100_000_000 + index), marketplace="ozon")
+    product = Product(
+        id=index, sku=sku, name="", url="", seller="amodecor", stock_fbo=10, stock_fbs=0, sales=[],
+    )
+    product.sales = [
+        Sale(quantity=rnd.randint(0, 5), date=START + timedelta(days=day), product_id=index,
+             in_stock=int(rnd.random() < 0.8))
+        for day in range(365 * years)
+    ]
+    return product
+
+
+def daily_update(product: Product, day: int, rnd: random.Random) -> SimpleNamespace:
+    last = START + timedelta(days=len(product.sales) - 1 + day)
+    rows = [
+        SimpleNamespace(quantity=rnd.randint(0, 5), date=last - timedelta(days=offset), in_stock=1)
+        for offset in (2, 1, 0)
+    ]
+    return SimpleNamespace(name="", stock_fbo=10, stock_fbs=0, sku=SimpleNamespace(sku=product.sku.sku), sales=rows)
+
+
+def run(years: int, products_count: int, updates: int, legacy: bool) -> float:
+    rnd = random.Random(years)
+    products = [build_product(index, years, rnd) for index in range(products_count)]
+    for product in products:
+        product.sales_history
+    batches = [[daily_update(product, day + 1, rnd) for product in products] for day in range(updates)]
+    started_at = time.perf_counter()
+    for batch in batches:
+        for product, data in zip(products, batch):
+            if legacy:
+                legacy_update(product, data)
+            else:
+                product.update(data)
+            product._get_sales_and_quantity(data.sales[-1].date - timedelta(days=30), data.sales[-1].date)
+    return (time.perf_counter() - started_at) / (updates * products_count)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=30)
+    args = parser.parse_args()
+    for years in range(1, 6):
+        legacy = run(years, args.products, args.updates, legacy=True)
+        indexed = run(years, args.products, args.updates, legacy=False)
+        print(
+            f"{years} year(s), {365 * years} days: legacy {legacy * 1e6:8.1f} µs/update, "
+            f"indexed {indexed * 1e6:6.1f} µs/update, x{legacy / indexed:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Офлайн-замер OzonAdvInfoUseCase на локальной замене API озона (benchmarks.fake_ozon)
+
+Сервер запускается в отдельном процессе, чтобы не влиять на замер памяти сценария.
+Отчёт: число запросов, общее время, p50/p95 задержки запросов, пиковая память (tracemalloc)
+и сверка опубликованных событий с ожидаемыми.
+
+Запуск: python -m benchmarks.bench_usecase --campaigns 50 --skus-per-campaign 2000 [--json results.jsonl]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import socket
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import Future
+from dataclasses import asdict
+
+from aiohttp import web
+
+from benchmarks.fake_ozon import FakeOzon, FakeOzonConfig
+from src.adapters.api_client import APIClient
+from src.adapters.marketplaces.ozon import OzonApiClient
+from src.adapters.metrics import MetricsCollector, RequestHooks, RequestInfo
+from src.adapters.rate_limiter import NullRateLimiter, TokenBucketRateLimiter
+from src.adapters.retry import RetryPolicy
+from src.application.interfaces.event_publisher import AbstractEventPublisher
+from src.application.usecase import OzonAdvInfoUseCase
+from src.config import config as CONFIG
+
+SELLER = "amodecor"
+API_KEYS = {
+    SELLER: {
+        "ozon": {
+            "client_id": "1",
+            "api_key": "key",
+            "client_adv_id": "adv-1",
+            "client_adv_secret": "secret",
+        }
+    }
+}
+
+
+class InMemoryEventPublisher(AbstractEventPublisher):
+    def __init__(self):
+        self.events = []
+        self._pending = 0
+
+    def _registration(self, event, topic, **kwargs):
+        self.events.append((topic, event))
+        self._pending += 1
+        future = Future()
+        future.set_result(str(self._pending))
+        return future
+
+    async def flush(self, timeout: float = 30) -> list[str]:
+        ids = [str(index) for index in range(self._pending)]
+        self._pending = 0
+        return ids
+
+
+class LatencyRecorder(RequestHooks):
+    """
+    Точные задержки всех попыток запросов (у MetricsCollector - гистограммы)
+    """
+
+    def __init__(self):
+        self.latencies: list[float] = []
+
+    def on_request_end(self, info: RequestInfo) -> None:
+        self.latencies.append(info.elapsed)
+
+
+def _serve(config: FakeOzonConfig, port: int):
+    web.run_app(FakeOzon(config).build_app(), host="127.0.0.1", port=port, access_log=None, print=None)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_port(port: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+def _percentile(values: list[float], percent: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+async def run(config: FakeOzonConfig, base_url: str, rps: float | None, concurrency: int) -> dict:
+    CONFIG.API_KEYS = API_KEYS
+    rate_limiter = TokenBucketRateLimiter(default_rate_limit=(rps, int(rps))) if rps else NullRateLimiter()
+    latency_recorder = LatencyRecorder()
+    metrics = MetricsCollector()
+    api_client = APIClient(
+        rate_limiter=rate_limiter,
+        retry_policy=RetryPolicy(base_delay=0.1),
+        host_limits={"127.0.0.1": concurrency},
+        hooks=[latency_recorder, metrics],
+    )
+    ozon = OzonApiClient(
+        api_client, API_KEYS, max_concurrency=concurrency, seller_url=base_url, performance_url=base_url
+    )
+    publisher = InMemoryEventPublisher()
+    use_case = OzonAdvInfoUseCase(ozon=ozon, publisher=publisher, metrics=metrics)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        summary = await use_case()
+    finally:
+        wall_time = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await api_client.close()
+
+    expected = FakeOzon(config).expected_out_of_stock()
+    published = {event.sku for _, event in publisher.events}
+    return {
+        "config": asdict(config),
+        "rps": rps,
+        "concurrency": concurrency,
+        "requests": len(latency_recorder.latencies),
+        "wall_time_s": round(wall_time, 3),
+        "latency_p50_ms": round(_percentile(latency_recorder.latencies, 50) * 1000, 2),
+        "latency_p95_ms": round(_percentile(latency_recorder.latencies, 95) * 1000, 2),
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+        "events": len(publisher.events),
+        "events_expected": len(expected),
+        "events_match": published == expected,
+        "retries": summary["http"]["retries"],
+        "retry_sleep_s": summary["http"]["retry_sleep_s"],
+        "endpoints": {
+            endpoint: stats["requests"] for endpoint, stats in summary["http"]["endpoints"].items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--campaigns", type=int, default=50)
+    parser.add_argument("--skus-per-campaign", type=int, default=2000)
+    parser.add_argument("--search-promo-skus", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-429-rate", type=float, default=0.0)
+    parser.add_argument("--error-5xx-rate", type=float, default=0.0)
+    parser.add_argument("--campaign-total", action="store_true")
+    parser.add_argument("--rps", type=float, default=None, help="Лимит запросов в секунду, по умолчанию без лимита")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--json", help="Дописать результат строкой JSON в файл")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    config = FakeOzonConfig(
+        campaigns=args.campaigns,
+        skus_per_campaign=args.skus_per_campaign,
+        search_promo_skus=args.search_promo_skus,
+        latency=args.latency,
+        latency_jitter=args.latency / 2,
+        error_429_rate=args.error_429_rate,
+        error_5xx_rate=args.error_5xx_rate,
+        retry_after=0.2,
+        campaign_total=args.campaign_total,
+    )
+    port = _free_port()
+    server = multiprocessing.Process(target=_serve, args=(config, port), daemon=True)
+    server.start()
+    try:
+        asyncio.run(_wait_for_port(port))
+        result = asyncio.run(run(config, f"http://127.0.0.1:{port}", args.rps, args.concurrency))
+    finally:
+        server.terminate()
+        server.join()
+
+    for key, value in result.items():
+        if key != "config":
+            print(f"{key:>16}: {value}")
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as file:
+            file.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Локальная замена API озона для офлайн-замеров
+
+Реализует эндпоинты, которыми пользуется OzonApiClient:
+Performance API (token, campaign, campaign products, search_promo)
+и Seller API (product list, product info list, supply-order list).
+Задержка ответов, размер данных и доля ошибок 429/5xx настраиваются через FakeOzonConfig.
+
+Запуск отдельным сервером: python -m benchmarks.fake_ozon --port 8080
+"""
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass
+
+from aiohttp import web
+
+
+@dataclass
+class FakeOzonConfig:
+    campaigns: int = 50
+    skus_per_campaign: int = 2000
+    search_promo_skus: int = 2000
+    # Каталог, из которого берутся sku кампаний (пересечения кампаний дают повторы sku)
+    catalogue_size: int = 60000
+    out_of_stock_ratio: float = 0.1
+    latency: float = 0.02
+    latency_jitter: float = 0.01
+    error_429_rate: float = 0.0
+    error_5xx_rate: float = 0.0
+    retry_after: float = 1
+    # Возвращать ли total в товарах кампании (тогда клиент запрашивает страницы параллельно)
+    campaign_total: bool = False
+    seed: int = 0
+
+
+FIRST_SKU = 100_000_000
+
+
+class FakeOzon:
+    def __init__(self, config: FakeOzonConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._out_of_stock = {
+            FIRST_SKU + index
+            for index in self._random.sample(
+                range(config.catalogue_size), int(config.catalogue_size * config.out_of_stock_ratio)
+            )
+        }
+
+    def campaign_skus(self, campaign: int) -> list[int]:
+        start = campaign * self.config.skus_per_campaign // 2
+        return [
+            FIRST_SKU + (start + index) % self.config.catalogue_size
+            for index in range(self.config.skus_per_campaign)
+        ]
+
+    def search_promo_skus(self) -> list[int]:
+        return [FIRST_SKU + index for index in range(self.config.search_promo_skus)]
+
+    def _item(self, sku: int) -> dict:
+        has_stock = sku not in self._out_of_stock
+        return {
+            "id": sku - FIRST_SKU,
+            "offer_id": f"OFFER-{sku - FIRST_SKU}",
+            "sku": sku,
+            "sources": [{"sku": sku, "source": "sds"}],
+            "stocks": {"has_stock": has_stock, "stocks": [{"sku": sku, "present": int(has_stock), "reserved": 0}]},
+        }
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        config = self.config
+        await asyncio.sleep(max(0.0, config.latency + self._random.uniform(-1, 1) * config.latency_jitter))
+        roll = self._random.random()
+        if roll < config.error_429_rate:
+            return web.json_response(
+                {"message": "rate limit"}, status=429, headers={"Retry-After": str(config.retry_after)}
+            )
+        if roll < config.error_429_rate + config.error_5xx_rate:
+            return web.json_response({"message": "internal error"}, status=503)
+        return await handler(request)
+
+    async def token(self, request: web.Request) -> web.Response:
+        return web.json_response({"access_token": "fake-token", "expires_in": 1800, "token_type": "Bearer"})
+
+    async def campaigns(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"list": [{"id": str(campaign), "state": "CAMPAIGN_STATE_RUNNING"} for campaign in
+                      range(1, self.config.campaigns + 1)]}
+        )
+
+    @staticmethod
+    def _page(skus: list[int], request: web.Request) -> tuple[list[dict], int]:
+        page = int(request.query.get("page", 0))
+        page_size = int(request.query.get("pageSize", 100))
+        return [{"sku": str(sku)} for sku in skus[page * page_size:(page + 1) * page_size]], len(skus)
+
+    async def campaign_products(self, request: web.Request) -> web.Response:
+        products, total = self._page(self.campaign_skus(int(request.match_info["campaign_id"])), request)
+        body = {"products": products}
+        if self.config.campaign_total:
+            body["total"] = str(total)
+        return web.json_response(body)
+
+    async def search_promo_products(self, request: web.Request) -> web.Response:
+        products, total = self._page(self.search_promo_skus(), request)
+        return web.json_response({"products": products, "total": str(total)})
+
+    async def product_list(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        limit = int(body.get("limit", 1000))
+        start = int(body.get("last_id") or 0)
+        end = min(start + limit, self.config.catalogue_size)
+        items = [{"product_id": index, "offer_id": f"OFFER-{index}"} for index in range(start, end)]
+        return web.json_response(
+            {"result": {"items": items, "total": self.config.catalogue_size, "last_id": str(end) if items else ""}}
+        )
+
+    async def product_info_list(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        skus = [int(sku) for sku in body.get("sku", [])]
+        for offer_id in body.get("offer_id", []):
+            if offer_id.startswith("OFFER-"):
+                skus.append(FIRST_SKU + int(offer_id.removeprefix("OFFER-")))
+        catalogue_end = FIRST_SKU + self.config.catalogue_size
+        return web.json_response({"items": [self._item(sku) for sku in skus if FIRST_SKU <= sku < catalogue_end]})
+
+    async def supply_order_list(self, request: web.Request) -> web.Response:
+        return web.json_response({"supply_order_id": [], "last_supply_order_id": 0})
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_post("/api/client/token", self.token)
+        app.router.add_get("/api/client/campaign", self.campaigns)
+        app.router.add_get("/api/client/campaign/{campaign_id}/v2/products", self.campaign_products)
+        app.router.add_post("/api/client/campaign/search_promo/v2/products", self.search_promo_products)
+        app.router.add_post("/v3/product/list", self.product_list)
+        app.router.add_post("/v3/product/info/list", self.product_info_list)
+        app.router.add_post("/v2/supply-order/list", self.supply_order_list)
+        return app
+
+    def expected_out_of_stock(self) -> set[int]:
+        """
+        Множество рекламируемых sku без остатка
+        """
+        advertised = set(self.search_promo_skus())
+        for campaign in range(1, self.config.campaigns + 1):
+            advertised.update(self.campaign_skus(campaign))
+        return advertised & self._out_of_stock
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--campaigns", type=int, default=50)
+    parser.add_argument("--skus-per-campaign", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    config = FakeOzonConfig(
+        campaigns=args.campaigns, skus_per_campaign=args.skus_per_campaign, latency=args.latency
+    )
+    web.run_app(FakeOzon(config).build_app(), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
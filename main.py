@@ -1,24 +1,53 @@
+from __future__ import annotations
+
 import asyncio
+import threading
+from typing import TYPE_CHECKING
+
 import functions_framework
-from src.application.usecase import OzonAdvInfoUseCase
 import logging
 
+if TYPE_CHECKING:
+    from src.application.usecase import OzonAdvInfoUseCase
 
 
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
 logger = logging.getLogger(__name__)  
 
+# Состояние тёплого экземпляра: сценарий с его клиентами и event loop,
+# к которому привязан пул HTTP-соединений, переиспользуются между вызовами
+_lock = threading.Lock()
+_loop: asyncio.AbstractEventLoop | None = None
+_use_case: OzonAdvInfoUseCase | None = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+
+def _get_use_case() -> OzonAdvInfoUseCase:
+    global _use_case
+    if _use_case is None:
+        # Зависимости сценария (aiohttp, pubsub, настройки) импортируются при первом вызове
+        from src.application.usecase import OzonAdvInfoUseCase
+
+        _use_case = OzonAdvInfoUseCase()
+    return _use_case
+
+
 @functions_framework.http
 def run_adv_info(request):
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
     try:
-        use_case = OzonAdvInfoUseCase()
-        asyncio.run(use_case())
-        return {"status": "success"}, 200
+        with _lock:
+            summary = _get_loop().run_until_complete(_get_use_case()())
+        return {"status": "success", "summary": summary}, 200
     except Exception as e:
         logger.exception(f"Error executing run_adv_info: {e}")
         return {"status": "error"}, 500
-
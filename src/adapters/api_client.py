@@ -1,56 +1,209 @@
+from __future__ import annotations
+
 import asyncio
 import logging
-import random
-from typing import Any
-
-import aiohttp
-from aiohttp import ClientTimeout, TCPConnector
+import time
+import weakref
+from functools import cache
+from typing import TYPE_CHECKING, Any, Callable
+from urllib.parse import urlsplit
 
+from src.adapters.exceptions import (
+    APIClientError,
+    APIConnectionError,
+    APIStatusError,
+    RetryBudgetExceededError,
+)
+from src.adapters.metrics import RequestHooks, RequestInfo, endpoint_template
+from src.adapters.rate_limiter import AbstractRateLimiter, TokenBucketRateLimiter
+from src.adapters.retry import RetryPolicy, parse_retry_after
 from src.application.interfaces.api_client import AbstractApiClient
 
+if TYPE_CHECKING:
+    import aiohttp
+
 logger = logging.getLogger(__name__)
 
+# Лимиты одновременных соединений для хостов озона
+DEFAULT_HOST_LIMITS = {
+    "api-seller.ozon.ru": 10,
+    "api-performance.ozon.ru": 10,
+}
+
+
+@cache
+def _network_errors() -> tuple[type[BaseException], ...]:
+    """
+    Ошибки, после которых запрос повторяется (aiohttp импортируется при первом запросе)
+    """
+    import aiohttp
+
+    return aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError
+
 
 class APIClient(AbstractApiClient):
     """
     Реализация API Клиента
+
+    Держит одну сессию с пулом соединений на event loop,
+    поэтому TLS-рукопожатия, keep-alive соединения и кэш DNS переиспользуются между запросами.
+    Сессию можно закрыть явно через close() или используя клиент как асинхронный контекстный менеджер.
+    Каждый запрос проходит через ограничитель частоты по паре (хост, Client-Id),
+    ключ ограничителя можно передать явно параметром rate_limit_key.
+    Параметр parser принимает функцию разбора тела ответа (bytes), например PageProjection,
+    вместо декодирования всего JSON через response.json().
+    Повторы выполняются по политике RetryPolicy, неуспешный запрос поднимает APIClientError.
+    О начале, завершении и повторе каждой попытки сообщается хукам hooks (например, MetricsCollector)
     """
 
+    def __init__(
+            self,
+            limit: int = 100,
+            limit_per_host: int = 10,
+            host_limits: dict[str, int] | None = None,
+            timeout: float = 30,
+            rate_limiter: AbstractRateLimiter | None = None,
+            retry_policy: RetryPolicy | None = None,
+            hooks: list[RequestHooks] | None = None,
+    ):
+        """
+        :param limit: Максимальное количество одновременно открытых соединений
+        :param limit_per_host: Лимит соединений для хоста, отсутствующего в host_limits
+        :param host_limits: Лимиты соединений для отдельных хостов
+        :param timeout: Таймаут запроса в секундах
+        :param rate_limiter: Ограничитель частоты запросов
+        :param retry_policy: Политика повторных попыток
+        :param hooks: Хуки запросов
+        """
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._host_limits = DEFAULT_HOST_LIMITS | (host_limits or {})
+        self._timeout = timeout
+        self._rate_limiter = rate_limiter or TokenBucketRateLimiter()
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._hooks = list(hooks or [])
+        self._sessions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._host_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
     def __getstate__(self):
-        return self.__dict__.copy()
+        state = self.__dict__.copy()
+        del state["_sessions"]
+        del state["_host_semaphores"]
+        return state
 
     def __setstate__(self, state):
         self.__dict__.update(state)
+        self._sessions = weakref.WeakKeyDictionary()
+        self._host_semaphores = weakref.WeakKeyDictionary()
+
+    async def __aenter__(self) -> "APIClient":
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Возвращает сессию текущего event loop, создавая её при необходимости
+        """
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._limit,  # Максимальное количество одновременно открытых соединений
+                limit_per_host=0,  # Лимиты по хостам ограничиваются семафорами _get_host_semaphore
+                ttl_dns_cache=300,  # Кэш DNS-запросов на 300 секунд
+                enable_cleanup_closed=True,  # Очистка закрытых соединений из пула
+            )
+            session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self._timeout), connector=connector)
+            self._sessions[loop] = session
+        return session
+
+    def _get_host_semaphore(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphores = self._host_semaphores.setdefault(loop, {})
+        if host not in semaphores:
+            semaphores[host] = asyncio.Semaphore(self._host_limits.get(host, self._limit_per_host))
+        return semaphores[host]
+
+    async def close(self) -> None:
+        """
+        Закрывает сессию текущего event loop
+        """
+        loop = asyncio.get_running_loop()
+        self._host_semaphores.pop(loop, None)
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
 
     async def _make_request(
             self, method: str, url: str, **kwargs: dict[str, Any]
-    ) -> dict[str, Any] | None | str | list:
+    ) -> dict[str, Any] | str | list:
         """
         :param method: Метод запроса
         :param url: Адрес Запроса
-        :param kwargs: Параметры Запроса
+        :param kwargs: Параметры Запроса, а также rate_limit_key и parser
+        :raises APIStatusError: Сервер ответил неповторяемой ошибкой или попытки закончились
+        :raises APIConnectionError: Сетевая ошибка на последней попытке
+        :raises RetryBudgetExceededError: Исчерпан бюджет времени на повторы
         """
 
-        for _ in range(5):
+        host = urlsplit(url).hostname or ""
+        rate_limit_key = kwargs.pop("rate_limit_key", None) or (kwargs.get("headers") or {}).get("Client-Id")
+        parser: Callable[[bytes], Any] | None = kwargs.pop("parser", None)
+        policy = self._retry_policy
+        error: APIClientError | None = None
+        for attempt in range(1, policy.max_attempts + 1):
+            retry_after = None
+            info = RequestInfo(method=method, url=url, endpoint=endpoint_template(url), attempt=attempt)
             try:
-                timeout = ClientTimeout(total=30)
-                connector = TCPConnector(
-                    limit=100,  # Максимальное количество одновременно открытых соединений
-                    limit_per_host=10,  # Лимит соединений для одного хоста
-                    ttl_dns_cache=300,  # Кэш DNS-запросов на 300 секунд
-                    enable_cleanup_closed=True,  # Очистка закрытых соединений из пула
-                )
-                async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-                    async with session.request(method, url, **kwargs) as response:
-                        if response.status >= 400:
+                async with self._get_host_semaphore(host):
+                    # Токен берётся после получения слота: иначе запросы, ждущие слот, тратят токены
+                    # заранее и уходят на сервер разом, как только слоты освобождаются
+                    await self._rate_limiter.acquire(host, rate_limit_key)
+                    for hook in self._hooks:
+                        hook.on_request_start(info)
+                    started_at = time.perf_counter()
+                    try:
+                        async with self._get_session().request(method, url, **kwargs) as response:
+                            info.status = response.status
+                            body = await response.read()
+                            info.bytes_received = len(body)
+                            if response.status < 400:
+                                logger.debug(f"status - {response.status}, url - {url}")
+                                if parser is not None:
+                                    return parser(body)
+                                return await response.json()
                             logger.warning(f"status - {response.status}, url - {url}")
-                        else:
-                            logger.debug(f"status - {response.status}, url - {url}")
-                        response.raise_for_status()
-                        return await response.json()
-            except Exception as e:
-                logger.exception(f"Error occurred while making request, {e}")
-                await asyncio.sleep(random.uniform(5, 20))
+                            error = APIStatusError(url, response.status, body.decode(errors="replace"))
+                            info.error = error
+                            if not policy.is_retryable_status(response.status):
+                                raise error
+                            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    except Exception as e:
+                        info.error = e
+                        raise
+                    finally:
+                        info.elapsed = time.perf_counter() - started_at
+                        for hook in self._hooks:
+                            hook.on_request_end(info)
+            except _network_errors() as e:
+                logger.warning(f"Error occurred while making request, {e!r}, url - {url}")
+                error = APIConnectionError(url, repr(e))
+
+            if attempt == policy.max_attempts:
+                break
+            delay = policy.get_delay(attempt, retry_after)
+            if not policy.consume(delay):
+                raise RetryBudgetExceededError(url, f"retry budget {policy.budget}s is exhausted") from error
+            logger.info(f"retry {attempt} in {delay:.1f}s, url - {url}")
+            for hook in self._hooks:
+                hook.on_retry(info, delay)
+            await asyncio.sleep(delay)
+        raise error
 
     async def get(self, url: str, **kwargs: Any) -> dict | None:
         """
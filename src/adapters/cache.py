@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class JsonFileCacheBackend:
+    """
+    Хранение записей кэша в JSON-файле между запусками.
+    Ключи должны быть кортежами из значений, которые сохраняются в JSON
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> list[tuple[tuple, float, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return [(tuple(key), expires_at, value) for key, expires_at, value in json.load(file)]
+        except FileNotFoundError:
+            return []
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Cache file {self.path} is broken, skipped: {e!r}")
+            return []
+
+    def save(self, entries: list[tuple[tuple, float, Any]]) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump([[list(key), expires_at, value] for key, expires_at, value in entries], file,
+                      ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+
+class AsyncTTLCache:
+    """
+    Асинхронный read-through кэш с временем жизни записей и LRU-вытеснением
+
+    Одновременные промахи по одному ключу объединяются: значение запрашивается один раз,
+    остальные ожидают тот же результат. Отсутствующие в ответе ключи не кэшируются
+    """
+
+    def __init__(self, ttl: float = 60, max_size: int = 100_000, backend: JsonFileCacheBackend | None = None):
+        """
+        :param ttl: Время жизни записи в секундах
+        :param max_size: Максимальное число записей
+        :param backend: Хранилище для переиспользования кэша между запусками
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.backend = backend
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        if backend is not None:
+            now = time.time()
+            for key, expires_at, value in backend.load():
+                if expires_at > now:
+                    self._data[key] = (expires_at, value)
+            self._evict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _get(self, key: Hashable, now: float) -> tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= now:
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, entry[1]
+
+    def _set(self, key: Hashable, value: Any, now: float) -> None:
+        self._data[key] = (now + self.ttl, value)
+        self._data.move_to_end(key)
+
+    def _evict(self) -> None:
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    async def get_many(
+            self,
+            keys: list[Hashable],
+            fetch: Callable[[list[Hashable]], Awaitable[dict[Hashable, Any]]],
+    ) -> dict[Hashable, Any]:
+        """
+        Возвращает значения ключей, запрашивая отсутствующие одним вызовом fetch
+
+        :param keys: Ключи
+        :param fetch: Корутина, возвращающая {ключ: значение} для переданных ключей
+        """
+        now = time.time()
+        result = {}
+        waiting: dict[Hashable, asyncio.Future] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            found, value = self._get(key, now)
+            if found:
+                self.hits += 1
+                result[key] = value
+            elif key in self._pending:
+                self.hits += 1
+                waiting[key] = self._pending[key]
+            else:
+                self.misses += 1
+                missing.append(key)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in missing}
+            self._pending.update(futures)
+            try:
+                fetched = await fetch(missing)
+            except BaseException as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                    # Ошибку получит сам вызывающий, ожидающих может не быть
+                    future.exception()
+                raise
+            finally:
+                for key in missing:
+                    self._pending.pop(key, None)
+            now = time.time()
+            for key, future in futures.items():
+                value = fetched.get(key)
+                if value is not None:
+                    self._set(key, value, now)
+                    result[key] = value
+                future.set_result(value)
+            self._evict()
+
+        for key, future in waiting.items():
+            value = await asyncio.shield(future)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def persist(self) -> None:
+        """
+        Сохраняет действующие записи в backend
+        """
+        if self.backend is None:
+            return
+        now = time.time()
+        self.backend.save([(key, expires_at, value) for key, (expires_at, value) in self._data.items()
+                           if expires_at > now])
+
+
+def build_ttl_cache(ttl: float, max_size: int, path: str = "") -> AsyncTTLCache | None:
+    """
+    Создаёт кэш по настройкам: нулевое время жизни отключает кэш,
+    непустой path включает сохранение записей в JSON-файл
+    """
+    if ttl <= 0 or max_size <= 0:
+        return None
+    return AsyncTTLCache(ttl=ttl, max_size=max_size, backend=JsonFileCacheBackend(path) if path else None)
@@ -0,0 +1,31 @@
+class APIClientError(Exception):
+    """
+    Базовая ошибка клиента API
+    """
+
+    def __init__(self, url: str, message: str = ""):
+        self.url = url
+        super().__init__(f"{message}, url - {url}" if message else url)
+
+
+class APIStatusError(APIClientError):
+    """
+    Сервер ответил статусом ошибки
+    """
+
+    def __init__(self, url: str, status: int, body: str = ""):
+        self.status = status
+        self.body = body
+        super().__init__(url, f"status - {status}, body - {body[:500]}")
+
+
+class APIConnectionError(APIClientError):
+    """
+    Запрос не выполнен из-за сетевой ошибки или таймаута
+    """
+
+
+class RetryBudgetExceededError(APIClientError):
+    """
+    Исчерпан общий бюджет времени на повторные попытки
+    """
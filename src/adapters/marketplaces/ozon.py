@@ -1,17 +1,128 @@
 import asyncio
 import logging
-from typing import Any, TypedDict
-import requests
+import math
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+from src.adapters.cache import AsyncTTLCache
+from src.adapters.parsers import PageProjection
+from src.adapters.token_cache import TokenCache
+from src.application.adv_products import SEARCH_PROMO_ADV_ID, AdvProducts, ProductADV
 from src.application.interfaces.api_client import AbstractOzonApiClient, AbstractApiClient
 
 logger = logging.getLogger(__name__)
 
-ProductADV = TypedDict("ProductADV", {"sku": int,  "adv_id": str | int})
+SELLER_API_URL = "https://api-seller.ozon.ru"
+PERFORMANCE_API_URL = "https://api-performance.ozon.ru:443"
+
+# Максимальное количество товаров в одном запросе /v3/product/info/list
+PRODUCT_INFO_BATCH_SIZE = 1000
+# Размер страницы товаров рекламных кампаний
+ADV_PAGE_SIZE = 100
+# Сколько полученных, но ещё не обработанных страниц рекламы держать в памяти
+ADV_PAGES_QUEUE_SIZE = 50
+
+_END = object()
+
+# Из страниц товаров рекламы для проверки наличия нужны только sku
+_SKU_PAGE = PageProjection("sku", int)
+
+
+async def merge_async_iterators(iterators: list[AsyncIterator], maxsize: int = 0) -> AsyncIterator:
+    """
+    Объединяет асинхронные итераторы, обходя их параллельно,
+    и отдаёт элементы в порядке получения через очередь размером maxsize
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    async def drain(iterator: AsyncIterator):
+        async for item in iterator:
+            await queue.put(item)
+
+    def close_on_error():
+        # Непрочитанные элементы не нужны: потребитель получит ошибку из задачи.
+        # Ждать места в очереди нельзя - потребитель мог уже остановиться
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_END)
+
+    async def run():
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                for iterator in iterators:
+                    task_group.create_task(drain(iterator))
+        except ExceptionGroup as e:
+            close_on_error()
+            raise e.exceptions[0]
+        # При отмене конец очереди не нужен: её больше никто не читает
+        await queue.put(_END)
+
+    task = asyncio.create_task(run())
+    try:
+        while (item := await queue.get()) is not _END:
+            yield item
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
+            # wait не поднимает CancelledError задачи, но пропускает отмену самого потребителя
+            await asyncio.wait([task])
+
+
+def _item_skus(item: dict) -> set[int]:
+    """
+    Возвращает все sku товара из ответа /v3/product/info/list
+    (sku может лежать как в корне, так и в источниках и остатках)
+    """
+    skus = set()
+    if item.get("sku"):
+        skus.add(int(item["sku"]))
+    for source in item.get("sources") or []:
+        if source.get("sku"):
+            skus.add(int(source["sku"]))
+    for stock in (item.get("stocks") or {}).get("stocks") or []:
+        if stock.get("sku"):
+            skus.add(int(stock["sku"]))
+    return skus
+
+
+def _item_keys(item: dict, key: str) -> set:
+    """
+    Возвращает значения поля фильтра key, по которым находится товар из ответа /v3/product/info/list
+    """
+    if key == "sku":
+        return _item_skus(item)
+    if key == "offer_id":
+        return {item.get("offer_id")}
+    return {item.get("id")}
+
 
 class OzonApiClient(AbstractOzonApiClient):
-    def __init__(self, request: AbstractApiClient, api_keys: dict):
+    def __init__(
+            self,
+            request: AbstractApiClient,
+            api_keys: dict,
+            token_cache: TokenCache | None = None,
+            max_concurrency: int = 10,
+            seller_url: str = SELLER_API_URL,
+            performance_url: str = PERFORMANCE_API_URL,
+            product_cache: AsyncTTLCache | None = None,
+    ):
+        """
+        :param request: Клиент API
+        :param api_keys: Ключи продавцов
+        :param token_cache: Кэш токенов Performance API
+        :param max_concurrency: Максимальное число одновременных запросов страниц рекламы продавца
+        :param seller_url: Адрес Seller API
+        :param performance_url: Адрес Performance API
+        :param product_cache: Кэш ответов /v3/product/info/list, без него товары запрашиваются каждый раз
+        """
         self._api_client = request
         self._keys = api_keys
+        self._token_cache = token_cache or TokenCache()
+        self._max_concurrency = max_concurrency
+        self._seller_url = seller_url.rstrip("/")
+        self._performance_url = performance_url.rstrip("/")
+        self._product_cache = product_cache
 
     def __getstate__(self):
         return self.__dict__
@@ -20,21 +131,17 @@ class OzonApiClient(AbstractOzonApiClient):
         self.__dict__.update(state)
 
     def _get_headers(self, seller):
-        headers = requests.utils.default_headers()
-        headers["Client-Id"] = self._keys[seller]["ozon"]["client_id"]
-        headers["Api-Key"] = self._keys[seller]["ozon"]["api_key"]
-        return headers
+        # Стандартные заголовки (User-Agent, Accept, Accept-Encoding) проставляет aiohttp
+        return {
+            "Client-Id": self._keys[seller]["ozon"]["client_id"],
+            "Api-Key": self._keys[seller]["ozon"]["api_key"],
+        }
 
-    async def get_products(self, seller: str) -> list:
+    async def _iter_offer_ids(self, seller: str) -> AsyncIterator[list[str]]:
         """
-        Возвращает все активные продукты с озона
+        Возвращает артикулы всех видимых товаров постранично
         docs: https://docs.ozon.ru/api/seller/#operation/ProductAPI_GetProductListv3
-        docs: https://docs.ozon.ru/api/seller/#operation/ProductAPI_GetProductInfoList
         """
-        if self._keys[seller].get("ozon") is None:
-            return []
-        vendor_codes = []
-        result = []
         body = {
             "limit": 1000,
             "last_id": "",
@@ -44,63 +151,139 @@ class OzonApiClient(AbstractOzonApiClient):
         }
         while True:
             res = await self._api_client.post(
-                url="https://api-seller.ozon.ru/v3/product/list",
+                url=f"{self._seller_url}/v3/product/list",
                 headers=self._get_headers(seller),
                 json=body
             )
             if not res["result"]["items"]:
                 break
-            vendor_codes.extend(product["offer_id"] for product in res["result"]["items"])
+            yield [product["offer_id"] for product in res["result"]["items"]]
             body["last_id"] = res["result"]["last_id"]
-            await asyncio.sleep(1)
-
-        # Получение подробной инфы о продуктах
-        tasks = [self.get_ozon_product(vendor_code, seller) for vendor_code in vendor_codes]
-        tasks_chunked = [tasks[i:i + 10] for i in range(0, len(tasks), 10)]
-        for chunk in tasks_chunked:
-            res = await asyncio.gather(*chunk)
-            result.extend(res)
-            await asyncio.sleep(1)
+
+    async def _get_products_by_offer_ids(self, seller: str, offer_ids: list[str]) -> list[dict]:
+        """
+        Возвращает подробную информацию о товарах по артикулам.
+        Артикулы в верхнем регистре запрашиваются в тех же пачках, что и исходные,
+        и используются, если товар по исходному артикулу не найден
+        """
+        codes = list(dict.fromkeys(code for offer_id in offer_ids for code in (offer_id, offer_id.upper())))
+        by_offer_id = {item["offer_id"]: item for item in await self._get_products_info(seller, "offer_id", codes)}
+        result = []
+        for offer_id in offer_ids:
+            item = by_offer_id.get(offer_id) or by_offer_id.get(offer_id.upper())
+            if item:
+                result.append(item)
         return result
 
+    async def iter_products(self, seller: str) -> AsyncIterator[dict]:
+        """
+        Возвращает все активные продукты с озона по мере получения.
+        Подробная информация по странице артикулов запрашивается сразу,
+        параллельно с получением следующих страниц списка
+        docs: https://docs.ozon.ru/api/seller/#operation/ProductAPI_GetProductInfoList
+        """
+        if self._keys[seller].get("ozon") is None:
+            return
+        tasks: list[asyncio.Future] = []
+        try:
+            async for offer_ids in self._iter_offer_ids(seller):
+                tasks.append(asyncio.ensure_future(self._get_products_by_offer_ids(seller, offer_ids)))
+                while tasks and tasks[0].done():
+                    for product in tasks.pop(0).result():
+                        yield product
+            while tasks:
+                for product in await tasks.pop(0):
+                    yield product
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def get_products(self, seller: str) -> list:
+        """
+        Возвращает все активные продукты с озона
+        """
+        return [product async for product in self.iter_products(seller)]
+
     async def get_ozon_product(self, vendor_code_ozon: str | None, seller: str, sku: int | None = None) -> dict:
         if self._keys[seller].get("ozon") is None:
             return dict()
         if not sku:
-            vendor_codes = [vendor_code_ozon, vendor_code_ozon.upper()]
-            for code in vendor_codes:
-                body = {"offer_id": [code]}
-                res = await self._api_client.post(
-                    url="https://api-seller.ozon.ru/v3/product/info/list",
-                    headers=self._get_headers(seller),
-                    json=body
-                )
-
-                if not res:
-                    continue
-                return res["items"][0]
+            items = await self._get_products_by_offer_ids(seller, [vendor_code_ozon])
         else:
-            body = {"sku": [sku]}
-            res = await self._api_client.post(
-                url="https://api-seller.ozon.ru/v3/product/info/list",
+            items = await self._get_products_info(seller, "sku", [sku])
+        return items[0] if items else {}
+
+    async def _get_products_info(self, seller: str, key: str, values: list) -> list[dict]:
+        """
+        Возвращает подробную информацию о товарах.
+        Если задан product_cache, запрашиваются только отсутствующие в кэше товары
+
+        :param key: Поле фильтра (sku, offer_id или product_id)
+        :param values: Значения фильтра
+        """
+        if self._product_cache is None:
+            return await self._fetch_products_info(seller, key, values)
+        if key == "sku":
+            values = [int(value) for value in values]
+
+        async def fetch(keys: list[tuple]) -> dict[tuple, dict]:
+            items = await self._fetch_products_info(seller, key, [value for _, _, value in keys])
+            return {(seller, key, value): item for item in items for value in _item_keys(item, key)}
+
+        cached = await self._product_cache.get_many([(seller, key, value) for value in values], fetch)
+        # Один товар может находиться по нескольким значениям (например, sku FBO и FBS)
+        return list({id(item): item for item in cached.values()}.values())
+
+    async def _fetch_products_info(self, seller: str, key: str, values: list) -> list[dict]:
+        """
+        Запрашивает подробную информацию о товарах пачками по PRODUCT_INFO_BATCH_SIZE штук
+        docs: https://docs.ozon.ru/api/seller/#operation/ProductAPI_GetProductInfoList
+        """
+        tasks = [
+            self._api_client.post(
+                url=f"{self._seller_url}/v3/product/info/list",
                 headers=self._get_headers(seller),
-                json=body
+                json={key: values[i:i + PRODUCT_INFO_BATCH_SIZE]}
             )
-            if not res:
-                return {}
-            return res["items"][0]
+            for i in range(0, len(values), PRODUCT_INFO_BATCH_SIZE)
+        ]
+        result = []
+        for res in await asyncio.gather(*tasks):
+            if res:
+                result.extend(res.get("items", []))
+        return result
 
-        return {}
+    @property
+    def product_cache(self) -> AsyncTTLCache | None:
+        return self._product_cache
 
-    async def _get_token(self, seller: str) -> str:
+    @property
+    def token_cache(self) -> TokenCache:
+        return self._token_cache
+
+    def _get_adv_client_id(self, seller: str) -> str:
+        return self._keys[seller]["ozon"]["client_adv_id"]
+
+    async def _fetch_token(self, seller: str) -> tuple[str, float]:
         body = {
             "client_id": self._keys[seller]["ozon"]["client_adv_id"],
             "client_secret": self._keys[seller]["ozon"]["client_adv_secret"],
             "grant_type": "client_credentials"
         }
-        actions = await self._api_client.post("https://api-performance.ozon.ru/api/client/token",
-                                              json=body)
-        return actions['access_token'] if actions else ''
+        actions = await self._api_client.post(f"{self._performance_url}/api/client/token",
+                                              json=body, rate_limit_key=self._get_adv_client_id(seller))
+        if not actions:
+            return '', 0
+        return actions['access_token'], float(actions.get('expires_in', 0))
+
+    async def _get_token(self, seller: str) -> str:
+        """
+        Возвращает токен Performance API из кэша, обновляя его только при истечении срока
+        """
+        return await self._token_cache.get(
+            self._get_adv_client_id(seller),
+            lambda: self._fetch_token(seller)
+        )
 
     async def _get_all_adv(self, seller: str, **kwargs: Any) -> list | None:
         """
@@ -110,8 +293,9 @@ class OzonApiClient(AbstractOzonApiClient):
             set: Множество id рекламных компаний
         """
         actions = await self._api_client.get(
-            "https://api-performance.ozon.ru:443/api/client/campaign",
+            f"{self._performance_url}/api/client/campaign",
             headers={"Authorization": f"Bearer {await self._get_token(seller)}"},
+            rate_limit_key=self._get_adv_client_id(seller),
             params={
                 "advObjectType": "SKU",
                 "state": "CAMPAIGN_STATE_RUNNING",
@@ -123,87 +307,166 @@ class OzonApiClient(AbstractOzonApiClient):
 
         return actions['list']
 
+    async def _iter_pages(
+            self,
+            fetch_page: Callable[[int], Awaitable[dict | None]],
+            semaphore: asyncio.Semaphore,
+    ) -> AsyncIterator[list[dict]]:
+        """
+        Постранично обходит товары Performance API по мере получения страниц.
+        Если API вернул общее количество товаров, оставшиеся страницы запрашиваются параллельно,
+        иначе страницы запрашиваются по очереди до неполной страницы.
+        Число одновременных запросов ограничивает semaphore
+        """
+        async def fetch(page: int) -> dict | None:
+            async with semaphore:
+                return await fetch_page(page)
+
+        actions = await fetch(0)
+        if not actions or not actions["products"]:
+            return
+        yield actions["products"]
+
+        if actions.get("total") is not None:
+            pages = math.ceil(int(actions["total"]) / ADV_PAGE_SIZE)
+            tasks = [asyncio.ensure_future(fetch(page)) for page in range(1, pages)]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    actions = await task
+                    if actions and actions["products"]:
+                        yield actions["products"]
+            finally:
+                for task in tasks:
+                    task.cancel()
+            return
+
+        page = 0
+        while len(actions["products"]) >= ADV_PAGE_SIZE:
+            page += 1
+            actions = await fetch(page)
+            if not actions or not actions["products"]:
+                return
+            yield actions["products"]
+
+    async def _fetch_detail_adv_page(
+            self, seller: str, campaign_id: int, page: int, parser: PageProjection | None = None
+    ) -> dict | None:
+        return await self._api_client.get(
+            f"{self._performance_url}/api/client/campaign/{campaign_id}/v2/products",
+            headers={"Authorization": f"Bearer {await self._get_token(seller)}"},
+            rate_limit_key=self._get_adv_client_id(seller),
+            params={"page": page, "pageSize": ADV_PAGE_SIZE},
+            parser=parser,
+        )
+
+    def _iter_detail_adv(
+            self,
+            seller: str,
+            campaign_id: int,
+            semaphore: asyncio.Semaphore | None = None,
+            parser: PageProjection | None = None,
+    ) -> AsyncIterator[list]:
+        """
+        Возвращает товары рекламной кампании постранично, по мере получения страниц
+
+        :param parser: Разбор страницы, без него товары возвращаются полными словарями
+        """
+        return self._iter_pages(
+            partial(self._fetch_detail_adv_page, seller, campaign_id, parser=parser),
+            semaphore or asyncio.Semaphore(self._max_concurrency),
+        )
+
     async def _get_detail_adv(self, seller: str, campaign_id: int, **kwargs: Any) -> tuple[list, int] | None:
         """
         Возвращает полные данные определённой рекламной кампании
         """
         result = []
-        page = 0
-        while True:
-            actions = await self._api_client.get(
-                f"https://api-performance.ozon.ru:443/api/client/campaign/{campaign_id}/v2/products",
-                headers={"Authorization": f"Bearer {await self._get_token(seller)}"},
-                params={"page": page, "pageSize": 100}
-            )
+        async for products in self._iter_detail_adv(seller, campaign_id):
+            result.extend(products)
+        return result, campaign_id
 
-            if not actions:
-                return [], campaign_id
+    async def _fetch_search_adv_page(
+            self, seller: str, page: int, parser: PageProjection | None = None
+    ) -> dict | None:
+        return await self._api_client.post(
+            f"{self._performance_url}/api/client/campaign/search_promo/v2/products",
+            headers={"Authorization": f"Bearer {await self._get_token(seller)}"},
+            rate_limit_key=self._get_adv_client_id(seller),
+            params={
+                "pageSize": ADV_PAGE_SIZE,
+                "page": page,
+            },
+            parser=parser,
+        )
 
-            actions = actions["products"]
-            result.extend(actions)
-            if len(actions) < 100:
-                break
-            page += 1
+    def _iter_search_adv(
+            self, seller: str, semaphore: asyncio.Semaphore | None = None, parser: PageProjection | None = None
+    ) -> AsyncIterator[list]:
+        """
+        Возвращает продвигаемые в поиске товары постранично, по мере получения страниц
 
-        return result, campaign_id
+        :param parser: Разбор страницы, без него товары возвращаются полными словарями
+        """
+        return self._iter_pages(
+            partial(self._fetch_search_adv_page, seller, parser=parser),
+            semaphore or asyncio.Semaphore(self._max_concurrency),
+        )
 
     async def _get_all_search_adv(self, seller: str, **kwargs: Any) -> list | None:
         """
         Возвращает данные все продвигаемые в поиске товары
         """
         result = []
-        page = 0
-        while True:
-            actions = await self._api_client.post(
-                f"https://api-performance.ozon.ru:443/api/client/campaign/search_promo/v2/products",
-                headers={"Authorization": f"Bearer {await self._get_token(seller)}"},
-                params={
-                    "pageSize": 100,
-                    "page": page,
-                }
-            )
+        async for products in self._iter_search_adv(seller):
+            result.extend(products)
+        return result
 
-            if not actions:
-                return result
+    async def _iter_campaign_adv(
+            self, seller: str, campaign_id: str | int, semaphore: asyncio.Semaphore
+    ) -> AsyncIterator[tuple[str | int, list[int]]]:
+        async for skus in self._iter_detail_adv(seller, campaign_id, semaphore, parser=_SKU_PAGE):
+            yield campaign_id, skus
 
-            result.extend(actions["products"])
-            if int(actions['total']) < 100:
-                break
-            page += 1
-
-        return result
+    async def _iter_search_promo_adv(
+            self, seller: str, semaphore: asyncio.Semaphore
+    ) -> AsyncIterator[tuple[str | int, list[int]]]:
+        async for skus in self._iter_search_adv(seller, semaphore, parser=_SKU_PAGE):
+            yield SEARCH_PROMO_ADV_ID, skus
 
-    async def get_adv_info(self, seller: str, **kwargs: Any) -> list[ProductADV] | None:
+    async def _iter_adv_pages(self, seller: str) -> AsyncIterator[tuple[str | int, list[int]]]:
         """
-        Возвращает все артикулы товаров, 
-        которые в активных рекламных компаниях (Трафарет и продвижение в поиске)
-        и айди рекламируемного объекта
+        Возвращает страницы рекламируемых товаров парами (айди рекламируемого объекта, sku страницы)
+        по мере получения. Страницы всех кампаний запрашиваются параллельно,
+        но не больше max_concurrency запросов одновременно
         """
         if self._keys[seller].get("ozon") is None:
-            return []
+            return
 
         sku_ads_campaigns = await self._get_all_adv(seller)
-        result = []
-        # rk_object = {"sku": int,  "adv_id": ""}
-        tasks = []
-        api_interaction_limit = 5
-        for index in range(0, len(sku_ads_campaigns), api_interaction_limit):
-            batch = []
-            for difference in range(min(len(sku_ads_campaigns) - index, api_interaction_limit)):
-                batch += [self._get_detail_adv(seller, sku_ads_campaigns[index + difference]['id'])]
-            tasks.append(batch)
-
-        for task_group in tasks:
-            batch_result = await asyncio.gather(*task_group)
-            for campaign in batch_result:
-                for product in campaign[0]:
-                    result.append({"sku": int(product['sku']), "adv_id": campaign[1]})
-
-        search_ads = await self._get_all_search_adv(seller)
-
-        for search_ad in search_ads:
-            result.append({"sku": int(search_ad['sku']), "adv_id": "Продвижение в поиске"})
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        pages = [self._iter_campaign_adv(seller, campaign['id'], semaphore) for campaign in sku_ads_campaigns]
+        pages.append(self._iter_search_promo_adv(seller, semaphore))
+        async for page in merge_async_iterators(pages, maxsize=ADV_PAGES_QUEUE_SIZE):
+            yield page
+
+    async def iter_adv_info(self, seller: str, **kwargs: Any) -> AsyncIterator[ProductADV]:
+        """
+        Возвращает артикулы рекламируемых товаров и айди рекламируемого объекта
+        по мере получения страниц (Трафарет и продвижение в поиске)
+        """
+        async for adv_id, skus in self._iter_adv_pages(seller):
+            for sku in skus:
+                yield {"sku": sku, "adv_id": adv_id}
 
+    async def get_adv_info(self, seller: str, **kwargs: Any) -> AdvProducts:
+        """
+        Возвращает все артикулы товаров, 
+        которые в активных рекламных компаниях (Трафарет и продвижение в поиске)
+        и айди рекламируемного объекта
+        """
+        result = AdvProducts()
+        async for adv_id, skus in self._iter_adv_pages(seller):
+            result.extend(skus, adv_id)
         return result
 
     async def _get_supplies_id_list(self, seller: str) -> list[int]:
@@ -225,7 +488,7 @@ class OzonApiClient(AbstractOzonApiClient):
         }
         while True:
             res = await self._api_client.post(
-                url="https://api-seller.ozon.ru/v2/supply-order/list",
+                url=f"{self._seller_url}/v2/supply-order/list",
                 json=body,
                 headers=self._get_headers(seller)
             )
@@ -249,3 +512,20 @@ class OzonApiClient(AbstractOzonApiClient):
         if not product:
             return False
         return product["stocks"]["has_stock"]
+
+    async def check_stocks(self, seller: str, skus: Iterable[int]) -> dict[int, bool]:
+        """
+        Проверяет наличие сразу для множества товаров
+
+        Returns:
+            dict: {sku: есть ли товар в наличии}
+        """
+        result = dict.fromkeys((int(sku) for sku in skus), False)
+        if not result or self._keys[seller].get("ozon") is None:
+            return result
+        for item in await self._get_products_info(seller, "sku", list(result)):
+            has_stock = item["stocks"]["has_stock"]
+            for sku in _item_skus(item):
+                if sku in result:
+                    result[sku] = has_stock
+        return result
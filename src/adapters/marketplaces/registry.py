@@ -0,0 +1,74 @@
+import logging
+from typing import Callable, Iterator
+
+from src.application.interfaces.api_client import AbstractMarketplaceClient
+
+logger = logging.getLogger(__name__)
+
+AdapterFactory = Callable[[], AbstractMarketplaceClient]
+
+
+class MarketplaceRegistry:
+    """
+    Реестр клиентов маркетплейсов для пар (продавец, маркетплейс)
+
+    Клиент маркетплейса обслуживает всех продавцов, поэтому фабрика регистрируется на маркетплейс
+    и вызывается один раз при первом обращении. Для отдельного продавца можно зарегистрировать свою фабрику
+    """
+
+    def __init__(self):
+        self._factories: dict[tuple[str | None, str], AdapterFactory] = {}
+        self._adapters: dict[tuple[str | None, str], AbstractMarketplaceClient] = {}
+
+    def register(self, marketplace: str, factory: AdapterFactory, seller: str | None = None) -> None:
+        """
+        :param marketplace: Маркетплейс
+        :param factory: Функция создания клиента
+        :param seller: Продавец, если фабрика только для него
+        """
+        key = (seller, str(marketplace))
+        self._factories[key] = factory
+        self._adapters.pop(key, None)
+
+    def _key(self, seller: str, marketplace: str) -> tuple[str | None, str] | None:
+        for key in ((str(seller), str(marketplace)), (None, str(marketplace))):
+            if key in self._factories:
+                return key
+        return None
+
+    def supports(self, seller: str, marketplace: str) -> bool:
+        return self._key(seller, marketplace) is not None
+
+    def get(self, seller: str, marketplace: str) -> AbstractMarketplaceClient:
+        """
+        :raises KeyError: Для маркетплейса не зарегистрирован клиент
+        """
+        key = self._key(seller, marketplace)
+        if key is None:
+            raise KeyError(f"No adapter registered for {marketplace} ({seller})")
+        adapter = self._adapters.get(key)
+        if adapter is None:
+            adapter = self._adapters[key] = self._factories[key]()
+        return adapter
+
+    def discover(self, api_keys: dict) -> list[tuple[str, str]]:
+        """
+        Возвращает пары (продавец, маркетплейс), для которых в api_keys есть ключи
+        и зарегистрирован клиент. Маркетплейсы без клиента пропускаются с предупреждением
+        """
+        pairs = []
+        for seller, marketplaces in api_keys.items():
+            for marketplace, keys in (marketplaces or {}).items():
+                if not keys:
+                    continue
+                if not self.supports(seller, marketplace):
+                    logger.warning(f"Marketplace {marketplace} of {seller} is not supported, skipped")
+                    continue
+                pairs.append((seller, marketplace))
+        return pairs
+
+    def adapters(self) -> Iterator[AbstractMarketplaceClient]:
+        """
+        Созданные клиенты
+        """
+        return iter(list(self._adapters.values()))
@@ -0,0 +1,152 @@
+import bisect
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# Верхние границы корзин гистограммы задержек, в миллисекундах
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_ID_SEGMENT = re.compile(r"^\d+$")
+
+
+@lru_cache(maxsize=1024)
+def endpoint_template(url: str) -> str:
+    """
+    Шаблон эндпоинта для группировки метрик: числовые сегменты пути заменяются на {id}
+
+    Например, https://api-performance.ozon.ru:443/api/client/campaign/123/v2/products
+    -> api-performance.ozon.ru/api/client/campaign/{id}/v2/products
+    """
+    parts = urlsplit(url)
+    path = "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in parts.path.split("/"))
+    return f"{parts.hostname}{path}"
+
+
+@dataclass
+class RequestInfo:
+    """
+    Данные об одной попытке запроса, которые получают хуки
+    """
+    method: str
+    url: str
+    endpoint: str
+    attempt: int
+    status: int | None = None
+    elapsed: float = 0
+    bytes_received: int = 0
+    error: Exception | None = None
+
+
+class RequestHooks:
+    """
+    Хуки клиента API, по умолчанию ничего не делают
+    """
+
+    def on_request_start(self, info: RequestInfo) -> None:
+        pass
+
+    def on_request_end(self, info: RequestInfo) -> None:
+        """
+        Вызывается после каждой попытки, в том числе неуспешной (info.error)
+        """
+
+    def on_retry(self, info: RequestInfo, delay: float) -> None:
+        """
+        Вызывается перед ожиданием повторной попытки
+        """
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    retry_sleep: float = 0
+    bytes_received: int = 0
+    latency_sum: float = 0
+    latency_max: float = 0
+    statuses: dict[int, int] = field(default_factory=dict)
+    # Последняя корзина - задержки больше последней границы
+    latency_buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+
+    def percentile_ms(self, percent: float) -> float | None:
+        """
+        Оценка перцентиля по гистограмме (верхняя граница корзины, но не больше максимума)
+        """
+        if not self.requests:
+            return None
+        max_ms = round(self.latency_max * 1000, 2)
+        rank = self.requests * percent / 100
+        seen = 0
+        for index, count in enumerate(self.latency_buckets[:-1]):
+            seen += count
+            if seen >= rank:
+                return min(LATENCY_BUCKETS_MS[index], max_ms)
+        return max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "retry_sleep_s": round(self.retry_sleep, 3),
+            "bytes_received": self.bytes_received,
+            "latency_avg_ms": round(self.latency_sum / self.requests * 1000, 2) if self.requests else None,
+            "latency_max_ms": round(self.latency_max * 1000, 2),
+            "latency_p50_ms": self.percentile_ms(50),
+            "latency_p95_ms": self.percentile_ms(95),
+            "statuses": dict(self.statuses),
+            "latency_histogram_ms": dict(
+                zip([*map(str, LATENCY_BUCKETS_MS), "inf"], self.latency_buckets)
+            ),
+        }
+
+
+class MetricsCollector(RequestHooks):
+    """
+    Сборщик метрик запросов в памяти с гистограммами задержек по шаблонам эндпоинтов
+    """
+
+    def __init__(self):
+        self.endpoints: dict[str, EndpointStats] = {}
+
+    def _stats(self, endpoint: str) -> EndpointStats:
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        return stats
+
+    def on_request_end(self, info: RequestInfo) -> None:
+        stats = self._stats(info.endpoint)
+        stats.requests += 1
+        stats.latency_sum += info.elapsed
+        stats.latency_max = max(stats.latency_max, info.elapsed)
+        stats.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, info.elapsed * 1000)] += 1
+        stats.bytes_received += info.bytes_received
+        if info.status is not None:
+            stats.statuses[info.status] = stats.statuses.get(info.status, 0) + 1
+        if info.error is not None:
+            stats.errors += 1
+
+    def on_retry(self, info: RequestInfo, delay: float) -> None:
+        stats = self._stats(info.endpoint)
+        stats.retries += 1
+        stats.retry_sleep += delay
+
+    def reset(self) -> None:
+        self.endpoints = {}
+
+    def summary(self) -> dict:
+        """
+        Сводка по всем эндпоинтам и итоги запуска
+        """
+        endpoints = self.endpoints.values()
+        return {
+            "requests": sum(stats.requests for stats in endpoints),
+            "errors": sum(stats.errors for stats in endpoints),
+            "retries": sum(stats.retries for stats in endpoints),
+            "retry_sleep_s": round(sum(stats.retry_sleep for stats in endpoints), 3),
+            "bytes_received": sum(stats.bytes_received for stats in endpoints),
+            "endpoints": {endpoint: stats.to_dict() for endpoint, stats in sorted(self.endpoints.items())},
+        }
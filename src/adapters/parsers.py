@@ -0,0 +1,54 @@
+import json
+from functools import cache
+from typing import Any, Callable
+
+
+@cache
+def _loads() -> Callable[[bytes], Any]:
+    """
+    Самая быстрая доступная функция декодирования JSON: orjson, если установлен, иначе json
+    """
+    try:
+        import orjson
+    except ImportError:
+        return json.loads
+    return orjson.loads
+
+
+def loads(body: bytes) -> Any:
+    """
+    Декодирует тело ответа; пустое тело декодируется в None, как в aiohttp
+    """
+    if not body.strip():
+        return None
+    return _loads()(body)
+
+
+class PageProjection:
+    """
+    Разбор страницы списка, оставляющий от каждой строки только одно поле
+
+    Тело ответа вида {"products": [{"sku": "1", ...}, ...], "total": "10"}
+    превращается в {"products": [1, ...], "total": "10"}: полные словари строк живут
+    только до конца разбора страницы, дальше передаются компактные значения поля
+    """
+
+    def __init__(self, field: str, convert: Callable[[Any], Any] = int, items_key: str = "products"):
+        """
+        :param field: Оставляемое поле строки
+        :param convert: Преобразование значения поля
+        :param items_key: Ключ списка строк в ответе
+        """
+        self.field = field
+        self.convert = convert
+        self.items_key = items_key
+
+    def __call__(self, body: bytes) -> dict | None:
+        data = loads(body)
+        if not data:
+            return data
+        field, convert = self.field, self.convert
+        page = {self.items_key: [convert(item[field]) for item in data.get(self.items_key) or []]}
+        if data.get("total") is not None:
+            page["total"] = data["total"]
+        return page
@@ -0,0 +1,86 @@
+import abc
+import asyncio
+import time
+
+# Лимиты запросов по умолчанию для хостов озона: (запросов в секунду, размер всплеска)
+DEFAULT_RATE_LIMITS = {
+    "api-seller.ozon.ru": (10, 10),
+    "api-performance.ozon.ru": (5, 5),
+}
+
+
+class AbstractRateLimiter(abc.ABC):
+    """
+    Интерфейс ограничителя частоты запросов
+    """
+
+    @abc.abstractmethod
+    async def acquire(self, host: str, client_id: str | None = None) -> None:
+        """
+        Ожидает, пока запрос к хосту от имени client_id можно будет выполнить
+
+        :param host: Хост запроса
+        :param client_id: Идентификатор учётных данных, от имени которых выполняется запрос
+        """
+        raise NotImplementedError
+
+
+class NullRateLimiter(AbstractRateLimiter):
+    """
+    Ограничитель, пропускающий все запросы без ожидания
+    """
+
+    async def acquire(self, host: str, client_id: str | None = None) -> None:
+        return None
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        Резервирует токен и возвращает время ожидания до него в секундах
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+
+class TokenBucketRateLimiter(AbstractRateLimiter):
+    """
+    Ограничитель на основе token bucket с отдельным бакетом для каждой пары (хост, Client-Id)
+
+    Запросы резервируют токены в порядке поступления,
+    поэтому поток запросов идёт ровно с разрешённой частотой без фиксированных пауз
+    """
+
+    def __init__(
+            self,
+            rate_limits: dict[str, tuple[float, int]] | None = None,
+            default_rate_limit: tuple[float, int] = (10, 10),
+    ):
+        """
+        :param rate_limits: Лимиты по хостам: {хост: (запросов в секунду, размер всплеска)}
+        :param default_rate_limit: Лимит для хостов, отсутствующих в rate_limits
+        """
+        self._rate_limits = DEFAULT_RATE_LIMITS | (rate_limits or {})
+        self._default_rate_limit = default_rate_limit
+        self._buckets: dict[tuple[str, str | None], _TokenBucket] = {}
+
+    def _get_bucket(self, host: str, client_id: str | None) -> _TokenBucket:
+        key = (host, client_id)
+        if key not in self._buckets:
+            rate, burst = self._rate_limits.get(host, self._default_rate_limit)
+            self._buckets[key] = _TokenBucket(rate=float(rate), burst=int(burst))
+        return self._buckets[key]
+
+    async def acquire(self, host: str, client_id: str | None = None) -> None:
+        delay = self._get_bucket(host, client_id).reserve()
+        if delay:
+            await asyncio.sleep(delay)
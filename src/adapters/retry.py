@@ -0,0 +1,65 @@
+import random
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Возвращает задержку из заголовка Retry-After в секундах
+    (заголовок может содержать как число секунд, так и HTTP-дату)
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Политика повторных попыток запросов
+
+    Повторяются только 429, 5xx и сетевые ошибки.
+    Задержка берётся из Retry-After, а при его отсутствии растёт экспоненциально со случайным разбросом.
+    Суммарное время ожидания за запуск ограничено бюджетом budget
+    """
+    max_attempts: int = 5
+    base_delay: float = 1
+    max_delay: float = 30
+    budget: float = 120
+    spent: float = field(default=0, init=False)
+
+    @staticmethod
+    def is_retryable_status(status: int) -> bool:
+        return status == 429 or status >= 500
+
+    def get_delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """
+        :param attempt: Номер неудачной попытки, начиная с 1
+        :param retry_after: Задержка, которую запросил сервер
+        """
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def consume(self, delay: float) -> bool:
+        """
+        Списывает задержку из бюджета, возвращает False, если бюджета не хватает
+        """
+        if self.spent + delay > self.budget:
+            return False
+        self.spent += delay
+        return True
+
+    def reset(self) -> None:
+        """
+        Восстанавливает бюджет перед новым запуском
+        """
+        self.spent = 0
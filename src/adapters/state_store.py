@@ -0,0 +1,94 @@
+import json
+import os
+import sqlite3
+import threading
+
+from src.application.interfaces.state_store import AbstractStateStore, AdvState
+
+
+class JsonFileStateStore(AbstractStateStore):
+    """
+    Хранилище состояния в JSON-файле вида {seller: [[sku, adv_id, has_stock], ...]}
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def load(self, seller: str) -> AdvState:
+        with self._lock:
+            rows = self._read().get(seller, [])
+        return {(int(sku), str(adv_id)): bool(has_stock) for sku, adv_id, has_stock in rows}
+
+    def save(self, seller: str, state: AdvState) -> None:
+        with self._lock:
+            data = self._read()
+            data[seller] = [[sku, adv_id, has_stock] for (sku, adv_id), has_stock in state.items()]
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(data, file, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+
+
+class SqliteStateStore(AbstractStateStore):
+    """
+    Хранилище состояния в базе SQLite
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS adv_state ("
+                "seller TEXT NOT NULL, sku INTEGER NOT NULL, adv_id TEXT NOT NULL, has_stock INTEGER NOT NULL, "
+                "PRIMARY KEY (seller, sku, adv_id))"
+            )
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self, seller: str) -> AdvState:
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT sku, adv_id, has_stock FROM adv_state WHERE seller = ?", (seller,)
+            ).fetchall()
+        return {(sku, adv_id): bool(has_stock) for sku, adv_id, has_stock in rows}
+
+    def save(self, seller: str, state: AdvState) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM adv_state WHERE seller = ?", (seller,))
+            connection.executemany(
+                "INSERT INTO adv_state (seller, sku, adv_id, has_stock) VALUES (?, ?, ?, ?)",
+                ((seller, sku, adv_id, int(has_stock)) for (sku, adv_id), has_stock in state.items()),
+            )
+
+
+def build_state_store(path: str) -> AbstractStateStore | None:
+    """
+    Создаёт хранилище по пути: *.json - JSON-файл, иначе SQLite.
+    Пустой путь означает, что состояние не хранится
+    """
+    if not path:
+        return None
+    if path.endswith(".json"):
+        return JsonFileStateStore(path)
+    return SqliteStateStore(path)
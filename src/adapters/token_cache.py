@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Token:
+    value: str
+    expires_at: float
+    refresh_at: float
+
+
+class TokenCache:
+    """
+    Кэш токенов доступа по ключу (например, client_id продавца)
+
+    Токен обновляется заранее, за refresh_margin секунд до истечения expires_in,
+    а одновременные запросы на обновление одного ключа объединяются в один запрос
+    """
+
+    def __init__(self, refresh_margin: float = 60):
+        """
+        :param refresh_margin: За сколько секунд до истечения срока обновлять токен
+        """
+        self._refresh_margin = refresh_margin
+        self._tokens: dict[str, _Token] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+        self.fetches = 0
+        self.fetches_avoided = 0
+
+    def __getstate__(self):
+        return {"_refresh_margin": self._refresh_margin}
+
+    def __setstate__(self, state):
+        self.__init__(refresh_margin=state["_refresh_margin"])
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[tuple[str, float]]]) -> str:
+        """
+        Возвращает действующий токен, при необходимости получая новый
+
+        :param key: Ключ токена
+        :param fetch: Корутина получения токена, возвращающая (токен, expires_in в секундах)
+        """
+        token = self._tokens.get(key)
+        if token is not None and time.monotonic() < token.refresh_at:
+            self.fetches_avoided += 1
+            return token.value
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.fetches_avoided += 1
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(self._refresh(key, fetch))
+        self._pending[key] = task
+        return await asyncio.shield(task)
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[tuple[str, float]]]) -> str:
+        try:
+            value, expires_in = await fetch()
+            self.fetches += 1
+            if not value:
+                self._tokens.pop(key, None)
+                return value
+            now = time.monotonic()
+            self._tokens[key] = _Token(
+                value=value,
+                expires_at=now + expires_in,
+                refresh_at=now + expires_in - min(self._refresh_margin, expires_in / 2),
+            )
+            logger.debug(f"token for {key} refreshed, expires in {expires_in}s")
+            return value
+        finally:
+            self._pending.pop(key, None)
+
+    def invalidate(self, key: str) -> None:
+        """
+        Сбрасывает закэшированный токен
+        """
+        self._tokens.pop(key, None)
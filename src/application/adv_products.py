@@ -0,0 +1,104 @@
+from array import array
+from typing import Iterable, Iterator, TypedDict
+
+ProductADV = TypedDict("ProductADV", {"sku": int, "adv_id": str | int})
+
+# adv_id товаров, продвигаемых в поиске (у них нет рекламной кампании)
+SEARCH_PROMO_ADV_ID = "Продвижение в поиске"
+
+# Значение колонки кампаний для продвижения в поиске, id кампаний озона положительные
+_SEARCH_PROMO = -1
+
+
+class AdvProducts:
+    """
+    Рекламируемые товары продавца: пары (sku, adv_id) в двух колонках array('q')
+
+    Вместо словаря на каждую строку хранится 16 байт, продвижение в поиске
+    отмечается значением _SEARCH_PROMO в колонке кампаний.
+    При итерации строки отдаются словарями ProductADV, id кампании - строкой, как в ответе API.
+    Проверка sku in products и операции &, |, - над множествами sku
+    используют множество sku, которое строится при первом обращении
+    """
+
+    __slots__ = ("_skus", "_campaigns", "_sku_set")
+
+    def __init__(self, products: Iterable[ProductADV] = ()):
+        self._skus = array("q")
+        self._campaigns = array("q")
+        self._sku_set: frozenset[int] | None = None
+        for product in products:
+            self.append(product["sku"], product["adv_id"])
+
+    def append(self, sku: int, adv_id: str | int) -> None:
+        self._skus.append(int(sku))
+        self._campaigns.append(_SEARCH_PROMO if adv_id == SEARCH_PROMO_ADV_ID else int(adv_id))
+        self._sku_set = None
+
+    def extend(self, skus: Iterable[int], adv_id: str | int) -> None:
+        """
+        Добавляет страницу товаров одной кампании
+        """
+        start = len(self._skus)
+        self._skus.extend(map(int, skus))
+        campaign = _SEARCH_PROMO if adv_id == SEARCH_PROMO_ADV_ID else int(adv_id)
+        self._campaigns.extend(array("q", [campaign]) * (len(self._skus) - start))
+        self._sku_set = None
+
+    def __len__(self) -> int:
+        return len(self._skus)
+
+    def __iter__(self) -> Iterator[ProductADV]:
+        for sku, campaign in zip(self._skus, self._campaigns):
+            yield {"sku": sku, "adv_id": SEARCH_PROMO_ADV_ID if campaign == _SEARCH_PROMO else str(campaign)}
+
+    def __getitem__(self, index: int) -> ProductADV:
+        campaign = self._campaigns[index]
+        return {"sku": self._skus[index], "adv_id": SEARCH_PROMO_ADV_ID if campaign == _SEARCH_PROMO else str(campaign)}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(rows={len(self)}, skus={len(self.skus)})"
+
+    @property
+    def skus(self) -> frozenset[int]:
+        """
+        Множество рекламируемых sku
+        """
+        if self._sku_set is None:
+            self._sku_set = frozenset(self._skus)
+        return self._sku_set
+
+    def __contains__(self, sku: object) -> bool:
+        return sku in self.skus
+
+    @staticmethod
+    def _as_skus(other: "AdvProducts | Iterable[int]") -> frozenset[int]:
+        return other.skus if isinstance(other, AdvProducts) else frozenset(other)
+
+    def __and__(self, other: "AdvProducts | Iterable[int]") -> frozenset[int]:
+        return self.skus & self._as_skus(other)
+
+    def __or__(self, other: "AdvProducts | Iterable[int]") -> frozenset[int]:
+        return self.skus | self._as_skus(other)
+
+    def __sub__(self, other: "AdvProducts | Iterable[int]") -> frozenset[int]:
+        return self.skus - self._as_skus(other)
+
+    __rand__ = __and__
+    __ror__ = __or__
+
+    def __rsub__(self, other: Iterable[int]) -> frozenset[int]:
+        return frozenset(other) - self.skus
+
+    def search_promo_skus(self) -> frozenset[int]:
+        """
+        sku, продвигаемые в поиске
+        """
+        return frozenset(sku for sku, campaign in zip(self._skus, self._campaigns) if campaign == _SEARCH_PROMO)
+
+    def campaign_skus(self, campaign_id: str | int) -> frozenset[int]:
+        """
+        sku рекламной кампании
+        """
+        campaign = int(campaign_id)
+        return frozenset(sku for sku, row_campaign in zip(self._skus, self._campaigns) if row_campaign == campaign)
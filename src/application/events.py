@@ -1,15 +1,31 @@
-from dataclasses import dataclass    
+from dataclasses import dataclass, field
 
-@dataclass
+@dataclass(slots=True)
 class Event:
     pass
 
 class PubSubNotification(Event):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class FoundZeroStockEvent(Event):
     sku: int
     legal_entity: str
     adv_id: str
+    # Все рекламные кампании, в которых участвует товар
+    adv_ids: list[str | int] = field(default_factory=list)
 
+
+@dataclass(slots=True)
+class FoundBackInStockEvent(Event):
+    sku: int
+    legal_entity: str
+    adv_id: str
+    # Рекламные кампании, в которых товар снова в наличии
+    adv_ids: list[str | int] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class LowOnStock(Event):
+    # {"notification": schema.Notification}
+    data: dict
@@ -1,5 +1,7 @@
 from abc import abstractmethod, ABC
-from typing import Any
+from typing import Any, AsyncIterator, Iterable
+
+from src.application.adv_products import AdvProducts
 
 class AbstractApiClient(ABC):
     @abstractmethod
@@ -27,12 +29,38 @@ class AbstractApiClient(ABC):
         raise NotImplementedError
 
 
-class AbstractOzonApiClient(ABC):
+class AbstractMarketplaceClient(ABC):
+    """
+    Интерфейс клиента маркетплейса, нужный для проверки наличия рекламируемых товаров
+    """
+
+    @abstractmethod
+    def iter_adv_info(self, seller: str, **kwargs: Any) -> AsyncIterator[dict]:
+        """
+        :param seller: Продавец
+        :param kwargs: Параметры Запроса
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def check_stocks(self, seller: str, skus: Iterable[int]) -> dict[int, bool]:
+        """
+        :param seller: Продавец
+        :param skus: Артикулы товаров
+        """
+        raise NotImplementedError
+
+
+class AbstractOzonApiClient(AbstractMarketplaceClient):
 
     @abstractmethod
     async def get_products(self, seller: str) -> list:
         raise NotImplementedError
 
+    @abstractmethod
+    def iter_products(self, seller: str) -> AsyncIterator[dict]:
+        raise NotImplementedError
+
     @abstractmethod
     async def _get_all_adv(self, seller: str, **kwargs: Any) -> dict | None:
         """
@@ -61,10 +89,9 @@ class AbstractOzonApiClient(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def get_adv_info(self, seller: str, **kwargs: Any) -> dict | None:
+    async def get_adv_info(self, seller: str, **kwargs: Any) -> AdvProducts:
         """
-        :param url: Адрес Запроса
+        :param seller: Продавец
         :param kwargs: Параметры Запроса
         """
         raise NotImplementedError
-
@@ -1,4 +1,6 @@
 import abc
+from typing import Any
+
 from src.application import events
 
 
@@ -7,9 +9,9 @@ class AbstractEventPublisher(abc.ABC):
     Интерфейс работы с шиной событий для публикации событий
     """
 
-    def registration(self, event: events.Event, topic: str, **kwargs) -> None:
+    def registration(self, event: events.Event, topic: str, **kwargs) -> Any:
         """
-        Регистрация событий
+        Регистрация событий, не дожидается публикации (см. flush)
 
         Параметры:
         - event : Событие
@@ -20,7 +22,17 @@ class AbstractEventPublisher(abc.ABC):
         return id
 
     @abc.abstractmethod
-    def _registration(self, event: events.Event, topic: str, **kwargs) -> None:
+    def _registration(self, event: events.Event, topic: str, **kwargs) -> Any:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def flush(self, timeout: float = 30) -> list[str]:
+        """
+        Дожидается публикации всех зарегистрированных событий
+
+        Параметры:
+        - timeout : Максимальное время ожидания в секундах
+        """
         raise NotImplementedError
 
 
@@ -0,0 +1,31 @@
+import abc
+
+# Состояние рекламируемых товаров продавца: {(sku, adv_id): есть ли товар в наличии}
+AdvState = dict[tuple[int, str], bool]
+
+
+class AbstractStateStore(abc.ABC):
+    """
+    Интерфейс хранилища последнего известного состояния рекламируемых товаров
+    """
+
+    @abc.abstractmethod
+    def load(self, seller: str) -> AdvState:
+        """
+        Возвращает сохранённое состояние продавца (пустое, если его нет)
+
+        Параметры:
+        - seller : Продавец
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save(self, seller: str, state: AdvState) -> None:
+        """
+        Заменяет сохранённое состояние продавца
+
+        Параметры:
+        - seller : Продавец
+        - state : Состояние
+        """
+        raise NotImplementedError
@@ -1,5 +1,8 @@
 from __future__ import annotations
+import bisect
 import logging
+import weakref
+from array import array
 from enum import Enum
 from dataclasses import dataclass
 from datetime import datetime, timedelta
@@ -16,21 +19,39 @@ class ProductStatus(Enum):
     DEFAULT = ""
 
 
-@dataclass
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class Sku:
+    """Неизменяемый артикул товара, экземпляры из Sku.intern общие для одинаковых артикулов"""
     id: int | None
     vendor_code: str
     sku: str
     marketplace: str
 
-@dataclass
+    @classmethod
+    def intern(cls, id: int | None, vendor_code: str, sku: str, marketplace: str) -> Sku:
+        """
+        Возвращает уже созданный артикул (marketplace, sku) с теми же данными или создаёт новый
+        """
+        key = (marketplace, sku)
+        existing = _SKUS.get(key)
+        candidate = cls(id=id, vendor_code=vendor_code, sku=sku, marketplace=marketplace)
+        if existing is not None and existing == candidate:
+            return existing
+        _SKUS[key] = candidate
+        return candidate
+
+
+# Артикулы, на которые есть ссылки, по (marketplace, sku)
+_SKUS: weakref.WeakValueDictionary[tuple[str, str], Sku] = weakref.WeakValueDictionary()
+
+
+@dataclass(slots=True)
 class Sale:
     """Объект-значение, представляющая информацию о продаже"""
     quantity: int
     date: datetime
     product_id: int
     in_stock: int
-    product: schema.Product
 
     def update(self, sale_data: schema.Sale, internal_product_id: int):
         # Обновляем свойства основного класса продукта
@@ -42,11 +63,147 @@ class Sale:
         self.quantity = sale_data.quantity
 
 
+class SalesHistory:
+    """
+    Колоночное представление продаж товара, отсортированное по дате
+
+    Даты хранятся списком, количества и признаки наличия - массивами,
+    а префиксные суммы по дням в наличии позволяют считать продажи и дни в наличии
+    за любой период двумя бинарными поисками вместо прохода по всем продажам
+    """
+
+    __slots__ = (
+        "_source", "_size", "dates", "quantities", "in_stock", "_in_stock_days", "_in_stock_quantity",
+    )
+
+    def __init__(self, sales: list[Sale]):
+        self._source = sales
+        self._size = len(sales)
+        ordered = sorted(sales, key=lambda sale: sale.date)
+        self.dates = [sale.date for sale in ordered]
+        self.quantities = array("q", [sale.quantity for sale in ordered])
+        self.in_stock = array("b", [1 if sale.in_stock else 0 for sale in ordered])
+        # Префиксные суммы: дни в наличии и продажи в эти дни среди первых i записей
+        self._in_stock_days = array("q", [0])
+        self._in_stock_quantity = array("q", [0])
+        days = quantity = 0
+        for sale_quantity, in_stock in zip(self.quantities, self.in_stock):
+            if in_stock:
+                days += 1
+                quantity += sale_quantity
+            self._in_stock_days.append(days)
+            self._in_stock_quantity.append(quantity)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def is_built_from(self, sales: list[Sale]) -> bool:
+        return self._source is sales and self._size == len(sales)
+
+    def merge(self, sale: Sale):
+        """
+        Добавляет продажу, уже добавленную в исходный список, или обновляет продажу за ту же дату.
+        Префиксные суммы пересчитываются от даты продажи, поэтому продажа за последний день стоит O(1)
+        """
+        position = bisect.bisect_left(self.dates, sale.date)
+        if position < len(self.dates) and self.dates[position] == sale.date:
+            self.quantities[position] = sale.quantity
+            self.in_stock[position] = 1 if sale.in_stock else 0
+        else:
+            self.dates.insert(position, sale.date)
+            self.quantities.insert(position, sale.quantity)
+            self.in_stock.insert(position, 1 if sale.in_stock else 0)
+            self._in_stock_days.append(0)
+            self._in_stock_quantity.append(0)
+            self._size += 1
+        days = self._in_stock_days[position]
+        quantity = self._in_stock_quantity[position]
+        for index in range(position, len(self.dates)):
+            if self.in_stock[index]:
+                days += 1
+                quantity += self.quantities[index]
+            self._in_stock_days[index + 1] = days
+            self._in_stock_quantity[index + 1] = quantity
+
+    def period(self, period_start: datetime, period_end: datetime) -> tuple[int, int]:
+        """
+        Дни в наличии и продажи в эти дни за период, включая его границы
+        """
+        start = bisect.bisect_left(self.dates, period_start)
+        end = bisect.bisect_right(self.dates, period_end)
+        if start >= end:
+            return 0, 0
+        return (
+            self._in_stock_days[end] - self._in_stock_days[start],
+            self._in_stock_quantity[end] - self._in_stock_quantity[start],
+        )
+
+    def period_sales(self, period_start: datetime, period_end: datetime) -> tuple[int, int, bool]:
+        """
+        Дни в наличии, продажи и признак теоретических данных за период:
+        если товар был в наличии не меньше половины периода, продажи пересчитываются на весь период
+        """
+        period = (period_end - period_start).days
+        in_stock_days, quantity = self.period(period_start, period_end)
+        if in_stock_days >= period / 2:
+            return in_stock_days, int((quantity / in_stock_days) * period), True
+        return in_stock_days, quantity, False
+
+    def latest_in_stock_days(self, count: int | None = None) -> int:
+        """
+        Дни в наличии среди последних count записей (всех, если count не задан)
+        """
+        size = len(self.dates)
+        start = 0 if count is None else max(size - count, 0)
+        return self._in_stock_days[size] - self._in_stock_days[start]
+
+
+@dataclass(frozen=True, slots=True)
+class SalesPeriod:
+    """
+    Границы текущего и прошлого периода продаж длиной days дней, заканчивающихся в now.
+    Считаются один раз на пакет товаров
+    """
+    days: int
+    start: datetime
+    end: datetime
+    past_start: datetime
+    past_end: datetime
+
+    @classmethod
+    def ending_at(cls, days: int, now: datetime) -> SalesPeriod:
+        end = now.replace(second=0, microsecond=0)
+        start = (now - timedelta(days)).replace(second=0, microsecond=0)
+        return cls(days=days, start=start, end=end, past_start=start - timedelta(days), past_end=end - timedelta(days))
+
+    def sales_quantity(self, history: SalesHistory) -> int:
+        """
+        Продажи за период, те же, что sales_quantity отчёта Product.get_sales_and_availability_by_period
+        """
+        _, quantity, is_availability = history.period_sales(self.start, self.end)
+        if is_availability:
+            return quantity
+        _, past_quantity, is_availability = history.period_sales(self.past_start, self.past_end)
+        if is_availability:
+            return past_quantity
+        return quantity + past_quantity
+
+
 class Product:
     """
     Агрегат, представляющий собой товар
+
+    Продажи доступны списком sales, а для расчётов по периодам используется
+    колоночное представление sales_history, которое строится при первом обращении
+    и перестраивается после замены или изменения длины списка.
+    Индекс продаж по дате хранится между вызовами update и обновляется на месте
     """
 
+    __slots__ = (
+        "id", "sku", "name", "url", "seller", "_status", "stock_fbo", "stock_fbs",
+        "pre_replenishment_inventory", "_sales", "_sales_history", "_sales_by_date", "events", "__weakref__",
+    )
+
     def __init__(
             self,
             id: int,
@@ -75,6 +232,34 @@ class Product:
         self.sales = sales
         self.events: list[events.Event] = []
 
+    @property
+    def sales(self) -> list[Sale]:
+        return self._sales
+
+    @sales.setter
+    def sales(self, sales: list[Sale]):
+        self._sales = sales
+        self._sales_history: SalesHistory | None = None
+        self._sales_by_date: dict[datetime, Sale] | None = None
+
+    def _get_sales_by_date(self) -> dict[datetime, Sale]:
+        """
+        Индекс продаж по дате. Строится заново, если список продаж изменили в обход update,
+        продажи за повторяющиеся даты при этом схлопываются в последнюю
+        """
+        if self._sales_by_date is None or len(self._sales_by_date) != len(self._sales):
+            sales_by_date = {sale.date: sale for sale in self._sales}
+            if len(sales_by_date) != len(self._sales):
+                self.sales = list(sales_by_date.values())
+            self._sales_by_date = sales_by_date
+        return self._sales_by_date
+
+    @property
+    def sales_history(self) -> SalesHistory:
+        if self._sales_history is None or not self._sales_history.is_built_from(self._sales):
+            self._sales_history = SalesHistory(self._sales)
+        return self._sales_history
+
     @property
     def status(self):
         return ProductStatus(self._status)
@@ -95,13 +280,12 @@ class Product:
                 date=sl.date,
                 product_id=internal_id,
                 in_stock=sl.in_stock,
-                product=product
             )
             for sl in product.sales
         ]
-        product = cls(
+        return cls(
             id=internal_id,
-            sku=Sku(
+            sku=Sku.intern(
                 sku=product.sku.sku,
                 vendor_code=product.sku.vendor_code,
                 marketplace=product.sku.marketplace,
@@ -116,15 +300,12 @@ class Product:
             sales=sales,
             pre_replenishment_inventory=product.stock_fbo + product.stock_fbs,
         )
-        for sale in product.sales:
-            sale.product = product
-        return product
 
     @classmethod
     def create_without_sales(cls, product: schema.Product):
         product = cls(
             id=product.internal_id if isinstance(product.internal_id, int) else None,
-            sku=Sku(
+            sku=Sku.intern(
                 sku=product.sku.sku,
                 vendor_code=product.sku.vendor_code,
                 marketplace=product.sku.marketplace,
@@ -149,54 +330,51 @@ class Product:
             self.pre_replenishment_inventory = product.stock_fbs + product.stock_fbo
         self.stock_fbs = product.stock_fbs
         self.stock_fbo = product.stock_fbo
-        sales_dict = {(sale.product.sku.sku, sale.date): sale for sale in self.sales}
+        sales_by_date = self._get_sales_by_date()
+        history = self._sales_history
+        if history is not None and not history.is_built_from(self._sales):
+            history = self._sales_history = None
 
-        # Итерируем по product.sales
+        # Все продажи товара относятся к его sku, поэтому достаточно ключа по дате
         for sl_data in product.sales:
-            # Получаем ключ для словаря
-            key = (product.sku.sku, sl_data.date)
-
-            # Проверяем, есть ли продажа с таким ключом в словаре
-            if key in sales_dict:
+            sale = sales_by_date.get(sl_data.date)
+            if sale is not None:
                 # Обновляем существующую продажу
-                sales_dict[key].update(sl_data, self.id)
-                sales_dict[key].product = self
+                sale.update(sl_data, self.id)
             else:
-                # Создаем новую продажу и добавляем ее в словарь
-                new_sale = Sale(
+                # Создаем новую продажу и добавляем ее в индекс
+                sale = Sale(
                     quantity=sl_data.quantity,
                     date=sl_data.date,
                     product_id=self.id,
-                    product=self,
                     in_stock=sl_data.in_stock,
                 )
-                sales_dict[key] = new_sale
-                self.sales.append(new_sale)
-
-        # Если потребуется, обновляем список self.sales
-        self.sales = list(sales_dict.values())
+                sales_by_date[sl_data.date] = sale
+                self._sales.append(sale)
+            if history is not None:
+                history.merge(sale)
 
     def update_status(self):
-        self.sales.sort(key=lambda x: x.date, reverse=True)
+        history = self.sales_history
         if self.status == ProductStatus.DEFAULT:
-            is_absolute_new = not bool([sale for sale in self.sales if sale.in_stock])
+            is_absolute_new = not history.latest_in_stock_days()
             if is_absolute_new:
                 self.status = ProductStatus.ABSOLUTE_NEW
                 return
-            is_new = not bool([sale for sale in self.sales[0:15] if sale.in_stock])
+            is_new = not history.latest_in_stock_days(15)
             if is_new:
                 self.status = ProductStatus.NEW
                 return
             self.status = ProductStatus.ORDINARY
         elif self.status == ProductStatus.ORDINARY:
-            is_new = not bool([sale for sale in self.sales[0:15] if sale.in_stock])
+            is_new = not history.latest_in_stock_days(15)
             if is_new:
                 self.status = ProductStatus.NEW
                 return
         else:
-            info_month = [sale for sale in self.sales[0:30] if sale.in_stock]
-            is_stock = bool([sale for sale in self.sales[0:15] if sale.in_stock])
-            if len(info_month) > 15 and is_stock:
+            info_month = history.latest_in_stock_days(30)
+            is_stock = bool(history.latest_in_stock_days(15))
+            if info_month > 15 and is_stock:
                 self.status = ProductStatus.ORDINARY
                 return
 
@@ -209,29 +387,19 @@ class Product:
         """
         Метод возвращает количество продаж за период, и высчитывает теоретические данные
         """
-        period = (period_end - period_start).days
-        period_sales = [
-            s for s in self.sales if period_start <= s.date <= period_end and s.in_stock
-        ]
-        sale_period_qty = sum(s.quantity for s in period_sales)
-        in_stock_days = len(period_sales)
-        # если товар в наличии был больше периода высчитываем теоритические данные
-        if in_stock_days >= period / 2:
-            sale_period_qty = int((sale_period_qty / in_stock_days) * period)
-            return in_stock_days, sale_period_qty, True
-        return in_stock_days, sale_period_qty, False
+        return self.sales_history.period_sales(period_start, period_end)
 
     def get_sales_and_availability_by_period(
-            self, days: int
+            self, days: int, now: datetime | None = None
     ) -> schema.SalesAndAvailabilityReport:
         """
         Метод по периоду возвращающий продажи(фактические или теоретические)
         за этот период и наличие товара в периоде
+
+        :param now: Конец периода, по умолчанию текущее время UTC
         """
-        period_start = (datetime.utcnow() - timedelta(days)).replace(
-            second=0, microsecond=0
-        )
-        period_end = datetime.utcnow().replace(second=0, microsecond=0)
+        bounds = SalesPeriod.ending_at(days, now or datetime.utcnow())
+        period_start, period_end = bounds.start, bounds.end
         # случай 1 товар был весь текущий период или частично
         cur_availability, cur_quantity, is_availability = self._get_sales_and_quantity(
             period_start,
@@ -259,21 +427,19 @@ class Product:
             )
 
         # # случай 2 товара не было в текущем периоде
-        period_start = (datetime.utcnow() - timedelta(days * 2)).replace(
-            second=0, microsecond=0
-        )
+        period_start = bounds.past_start
         (
             past_availability,
             past_quantity,
             is_availability,
-        ) = self._get_sales_and_quantity(period_start, period_end - timedelta(days))
+        ) = self._get_sales_and_quantity(period_start, bounds.past_end)
         if is_availability:
             return schema.SalesAndAvailabilityReport(
                 availability_in_days=past_availability,
                 sales_quantity=past_quantity,
                 period=days,
                 start_date=period_start,
-                end_date=period_end - timedelta(days),
+                end_date=bounds.past_end,
                 is_theoretical=True,
             )
 
@@ -289,6 +455,111 @@ class Product:
         )
 
 
+@dataclass(frozen=True, slots=True)
+class ThresholdBand:
+    """
+    Полоса коэффициента запаса [coef_min, coef_max), в которой отправляется уведомление
+    """
+    coef_min: float
+    coef_max: float
+    status: str
+    count_sent: int
+
+
+class ThresholdBands:
+    """
+    Полосы коэффициента, отсортированные по нижней границе, для поиска полосы бинарным поиском
+    """
+
+    def __init__(self, *bands: ThresholdBand):
+        self.bands = tuple(sorted(bands, key=lambda band: band.coef_min))
+        self._edges = [band.coef_min for band in self.bands]
+
+    def classify(self, ratio: float) -> ThresholdBand | None:
+        index = bisect.bisect_right(self._edges, ratio) - 1
+        if index < 0:
+            return None
+        band = self.bands[index]
+        return band if ratio < band.coef_max else None
+
+
+_BAND_12 = ThresholdBand(coef_min=12.2, coef_max=1000, status="sent_12", count_sent=3)
+_BAND_6 = ThresholdBand(coef_min=6.2, coef_max=12.2, status="sent_6", count_sent=2)
+_BAND_3 = ThresholdBand(coef_min=3, coef_max=6.2, status="sent_3", count_sent=1)
+
+# Пороги уведомлений по статусу товара. Для обычного товара коэффициент - продажи за 30 дней к остатку,
+# для новых - остаток до пополнения к текущему остатку
+NOTIFICATION_THRESHOLDS = {
+    ProductStatus.ORDINARY: ThresholdBands(_BAND_12, _BAND_6),
+    ProductStatus.ABSOLUTE_NEW: ThresholdBands(_BAND_12, _BAND_6, _BAND_3),
+    ProductStatus.NEW: ThresholdBands(_BAND_12, _BAND_6, _BAND_3),
+}
+# Уведомления отправляются только для товаров с остатком от 1 до MAX_NOTIFICATION_STOCK
+MAX_NOTIFICATION_STOCK = 50
+# Период продаж для коэффициента обычного товара, в днях
+NOTIFICATION_SALES_PERIOD = 30
+
+
+@dataclass
+class StockFigures:
+    """
+    Колоночная таблица показателей товаров для пакетной проверки порогов уведомлений
+
+    sales - продажи за NOTIFICATION_SALES_PERIOD дней: коэффициент обычного товара и текст уведомления.
+    Заполнены только для строк, которые могут получить уведомление
+    """
+    statuses: list[ProductStatus]
+    stocks: array
+    pre_replenishment_inventory: array
+    sales: array
+    sent_statuses: list[str]
+
+    def __len__(self) -> int:
+        return len(self.statuses)
+
+    @classmethod
+    def from_products(
+            cls, products: list[Product], notifications: list[Notification], now: datetime | None = None
+    ) -> StockFigures:
+        """
+        Продажи считаются только для товаров с порогами и остатком от 1 до MAX_NOTIFICATION_STOCK,
+        границы периода - один раз на весь пакет
+        """
+        period = SalesPeriod.ending_at(NOTIFICATION_SALES_PERIOD, now or datetime.utcnow())
+        statuses = [product.status for product in products]
+        stocks = array("q", [product.stock for product in products])
+        sales = array("q", bytes(8 * len(products)))
+        for index, (status, stock, product) in enumerate(zip(statuses, stocks, products)):
+            if 0 < stock <= MAX_NOTIFICATION_STOCK and status in NOTIFICATION_THRESHOLDS:
+                sales[index] = period.sales_quantity(product.sales_history)
+        return cls(
+            statuses=statuses,
+            stocks=stocks,
+            pre_replenishment_inventory=array("q", [product.pre_replenishment_inventory for product in products]),
+            sales=sales,
+            sent_statuses=[notification.status for notification in notifications],
+        )
+
+    def classify(self) -> list[tuple[int, ThresholdBand]]:
+        """
+        Возвращает (индекс строки, полоса) для строк, по которым нужно отправить уведомление:
+        коэффициент попал в полосу, и по этой полосе уведомление ещё не отправлялось
+        """
+        result = []
+        ordinary = ProductStatus.ORDINARY
+        rows = zip(self.statuses, self.stocks, self.pre_replenishment_inventory, self.sales, self.sent_statuses)
+        for index, (status, stock, pre_replenishment_inventory, sales, sent_status) in enumerate(rows):
+            if not 0 < stock <= MAX_NOTIFICATION_STOCK:
+                continue
+            thresholds = NOTIFICATION_THRESHOLDS.get(status)
+            if thresholds is None:
+                continue
+            band = thresholds.classify((sales if status is ordinary else pre_replenishment_inventory) / stock)
+            if band is not None and band.status != sent_status:
+                result.append((index, band))
+        return result
+
+
 class Notification:
     def __init__(self, status: str, sku: Sku):
         self.status = status
@@ -305,100 +576,87 @@ class Notification:
         logger.info("added new event - LowOnStock")
         self.events.append(events.LowOnStock(data={"notification": notification}))
 
-    def _check_and_send(
-            self, notification: schema.Notification, ratio: float, thresholds: list[dict]
-    ) -> bool:
-        for threshold in thresholds:
-            if threshold.get("coef_min") <= ratio < threshold.get("coef_max"):
-                ban_status = threshold.get("status")
-                if self._can_send(ban_status):
-                    logger.info(f"threshold: {threshold} ratio: {ratio}")
-                    notification.status_notification = threshold.get("count_sent")
-                    self._send_notification_low_stock(notification)
-                    self._change_status(ban_status)
-                    return True
-        return False
+    def _send(self, notification: schema.Notification, band: ThresholdBand, ratio: float):
+        logger.info("threshold: %s ratio: %s", band, ratio)
+        notification.status_notification = band.count_sent
+        self._send_notification_low_stock(notification)
+        self._change_status(band.status)
 
-    def check_and_send_notification(
-            self,
-            product: Product,
-    ) -> bool:
-        if product.stock == 0:
-            logger.warning("Cannot create notification: product stock is zero")
-            return False
-        if product.stock > 50:
-            logger.warning("Cannot create notification: product stock is more than 50")
-            return False
-        sales_report = product.get_sales_and_availability_by_period(days=30)
-        self.checkers = {
-            ProductStatus.ORDINARY: sales_report.sales_quantity / product.stock,
-            ProductStatus.ABSOLUTE_NEW: product.pre_replenishment_inventory
-                                        / product.stock,
-            ProductStatus.NEW: product.pre_replenishment_inventory / product.stock,
-        }
-        self.thresholds = {
-            ProductStatus.ORDINARY: [
-                {
-                    "coef_min": 12.2,
-                    "coef_max": 1000,
-                    "status": "sent_12",
-                    "count_sent": 3,
-                },
-                {
-                    "coef_min": 6.2,
-                    "coef_max": 12.2,
-                    "status": "sent_6",
-                    "count_sent": 2,
-                },
-            ],
-            ProductStatus.ABSOLUTE_NEW: [
-                {
-                    "coef_min": 12.2,
-                    "coef_max": 1000,
-                    "status": "sent_12",
-                    "count_sent": 3,
-                },
-                {
-                    "coef_min": 6.2,
-                    "coef_max": 12.2,
-                    "status": "sent_6",
-                    "count_sent": 2,
-                },
-                {"coef_min": 3, "coef_max": 6.2, "status": "sent_3", "count_sent": 1},
-            ],
-            ProductStatus.NEW: [
-                {
-                    "coef_min": 12.2,
-                    "coef_max": 1000,
-                    "status": "sent_12",
-                    "count_sent": 3,
-                },
-                {
-                    "coef_min": 6.2,
-                    "coef_max": 12.2,
-                    "status": "sent_6",
-                    "count_sent": 2,
-                },
-                {"coef_min": 3, "coef_max": 6.2, "status": "sent_3", "count_sent": 1},
-            ],
-        }
-        notification = schema.Notification(
+    def _build_notification(self, product: Product, sales_quantity: int) -> schema.Notification:
+        return schema.Notification(
             seller=product.seller,
             name=product.name,
             vendor_code=product.sku.vendor_code,
             sku=self.sku.sku,
             mp=self.sku.marketplace,
             url_on_product=product.url,
-            sales_for_period=sales_report.sales_quantity,
+            sales_for_period=sales_quantity,
             stock_sum=product.stock,
             stock_fbo=product.stock_fbo,
             stock_fbs=product.stock_fbs,
             status_product=product.status.value,
             status_notification=0,
         )
-        res = self._check_and_send(
-            notification=notification,
-            ratio=self.checkers[product.status],
-            thresholds=self.thresholds[product.status],
-        )
-        return res
+
+    def check_and_send_notification(
+            self,
+            product: Product,
+    ) -> bool:
+        if product.stock == 0:
+            logger.warning("Cannot create notification: product stock is zero")
+            return False
+        if product.stock > MAX_NOTIFICATION_STOCK:
+            logger.warning("Cannot create notification: product stock is more than 50")
+            return False
+        thresholds = NOTIFICATION_THRESHOLDS.get(product.status)
+        if thresholds is None:
+            return False
+        # Продажи нужны для коэффициента только обычного товара, для новых - только в тексте уведомления
+        sales_quantity = None
+        if product.status == ProductStatus.ORDINARY:
+            sales_quantity = product.get_sales_and_availability_by_period(
+                days=NOTIFICATION_SALES_PERIOD
+            ).sales_quantity
+            ratio = sales_quantity / product.stock
+        else:
+            ratio = product.pre_replenishment_inventory / product.stock
+        band = thresholds.classify(ratio)
+        if band is None or not self._can_send(band.status):
+            return False
+        if sales_quantity is None:
+            sales_quantity = product.get_sales_and_availability_by_period(
+                days=NOTIFICATION_SALES_PERIOD
+            ).sales_quantity
+        self._send(self._build_notification(product, sales_quantity), band, ratio)
+        return True
+
+    @classmethod
+    def check_and_send_notifications(
+            cls,
+            items: list[tuple[Notification, Product]],
+            now: datetime | None = None,
+    ) -> list[events.LowOnStock]:
+        """
+        Пакетная проверка порогов для множества товаров: показатели, включая продажи за период,
+        собираются в StockFigures, коэффициенты считаются одним проходом по таблице.
+        Товары без остатка или с остатком больше MAX_NOTIFICATION_STOCK пропускаются без предупреждений
+
+        :param items: Пары (уведомление товара, товар)
+        :param now: Конец периода продаж, по умолчанию текущее время UTC
+        :return: Созданные события LowOnStock (они же добавляются в events уведомлений)
+        """
+        now = now or datetime.utcnow()
+        notifications = [notification for notification, _ in items]
+        products = [product for _, product in items]
+        figures = StockFigures.from_products(products, notifications, now)
+        result = []
+        for index, band in figures.classify():
+            notification, product = items[index]
+            sales_quantity = figures.sales[index]
+            if figures.statuses[index] == ProductStatus.ORDINARY:
+                ratio = sales_quantity / figures.stocks[index]
+            else:
+                ratio = figures.pre_replenishment_inventory[index] / figures.stocks[index]
+            notification._send(notification._build_notification(product, sales_quantity), band, ratio)
+            result.append(notification.events[-1])
+        return result
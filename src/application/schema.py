@@ -2,6 +2,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from enum import StrEnum
 from dataclasses import dataclass, asdict
+from datetime import datetime
 
 
 @dataclass
@@ -28,3 +29,29 @@ class DTO:
     def to_dict(self):
         return asdict(self)
 
+
+
+@dataclass
+class SalesAndAvailabilityReport(DTO):
+    availability_in_days: int
+    sales_quantity: int
+    period: int
+    start_date: datetime
+    end_date: datetime
+    is_theoretical: bool
+
+
+@dataclass
+class Notification(DTO):
+    seller: str
+    name: str
+    vendor_code: str
+    sku: str
+    mp: str
+    url_on_product: str
+    sales_for_period: int
+    stock_sum: int
+    stock_fbo: int
+    stock_fbs: int
+    status_product: str
+    status_notification: int
@@ -1,6 +1,24 @@
-from src.adapters.marketplaces.ozon import OzonApiClient
-from src.application.events import FoundZeroStockEvent
+import asyncio
+import json
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.adapters.marketplaces.ozon import PRODUCT_INFO_BATCH_SIZE, OzonApiClient
+from src.adapters.marketplaces.registry import MarketplaceRegistry
+from src.application.events import Event, FoundBackInStockEvent, FoundZeroStockEvent
+from src.application.interfaces.api_client import AbstractMarketplaceClient
+from src.application.interfaces.event_publisher import AbstractEventPublisher
+from src.application.interfaces.state_store import AbstractStateStore, AdvState
+from src.application.schema import LegalEntitiesEnum, MarketplacesEnum
 from src.adapters.api_client import APIClient
+from src.adapters.cache import build_ttl_cache
+from src.adapters.metrics import MetricsCollector
+from src.adapters.rate_limiter import TokenBucketRateLimiter
+from src.adapters.retry import RetryPolicy
+from src.adapters.state_store import build_state_store
+from src.adapters.token_cache import TokenCache
 from src.config import config as CONFIG
 from src.utils.event_publisher import EventPublisher
 import logging
@@ -13,56 +31,353 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Названия юрлиц в событиях, для продавцов не из таблицы используется их id
+ADV_LEGAL_ENTITIES = {
+    LegalEntitiesEnum.AMODECOR: "Амодекор",
+    LegalEntitiesEnum.DRIVE: "Драйв",
+    LegalEntitiesEnum.CENTURION: "Центурион",
+    LegalEntitiesEnum.STROY_OTDELKA: "СтройОтделка",
+    LegalEntitiesEnum.ORION: "Орион",
+}
+
+
+async def _next_batch(queue: asyncio.Queue, size: int) -> list:
+    """
+    Ждёт первый элемент очереди и добирает к нему уже готовые, не больше size.
+    Пустой список означает, что очередь закрыта (получен None)
+    """
+    item = await queue.get()
+    if item is None:
+        return []
+    batch = [item]
+    while len(batch) < size:
+        try:
+            item = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        if item is None:
+            queue.put_nowait(None)
+            break
+        batch.append(item)
+    return batch
+
+
+def _is_published(handle: Any) -> bool:
+    """
+    Опубликовано ли событие по результату registration: None - ошибка регистрации,
+    future - успех, только если она завершилась без ошибки
+    """
+    if handle is None:
+        return False
+    if isinstance(handle, (Future, asyncio.Future)):
+        return handle.done() and not handle.cancelled() and handle.exception() is None
+    return True
+
+
+@dataclass
+class _PendingState:
+    """
+    Новое состояние продавца, которое сохраняется только после публикации событий
+    """
+    key: str
+    state: AdvState
+    previous: AdvState
+    # (результат registration, ключи состояния, о которых сообщает событие)
+    events: list[tuple[Any, list[tuple[int, str]]]] = field(default_factory=list)
+
+    def published_state(self) -> AdvState:
+        """
+        Состояние, в котором для неопубликованных событий остались прошлые значения,
+        чтобы следующий запуск отправил их снова
+        """
+        state = dict(self.state)
+        for handle, keys in self.events:
+            if _is_published(handle):
+                continue
+            for key in keys:
+                if key in self.previous:
+                    state[key] = self.previous[key]
+                else:
+                    state.pop(key, None)
+        return state
+
 
 class OzonAdvInfoUseCase:
-    async def __call__(self):
+    """
+    Проверка наличия товаров, участвующих в рекламе маркетплейсов
+
+    Пары (продавец, маркетплейс) берутся из ключей API_KEYS, клиенты маркетплейсов - из реестра.
+    Клиенты (пул HTTP-соединений, кэш токенов, публикатор событий) создаются при первом запуске
+    и переиспользуются следующими запусками того же экземпляра
+    """
+
+    def __init__(
+            self,
+            ozon: OzonApiClient | None = None,
+            publisher: AbstractEventPublisher | None = None,
+            state_store: AbstractStateStore | None = None,
+            metrics: MetricsCollector | None = None,
+            registry: MarketplaceRegistry | None = None,
+    ):
+        """
+        Не переданные зависимости создаются по настройкам при первом запуске
+
+        :param ozon: Клиент API озона
+        :param publisher: Публикатор событий
+        :param state_store: Хранилище состояния прошлого запуска
+        :param metrics: Сборщик метрик запросов клиента API, переданного в ozon
+        :param registry: Реестр клиентов маркетплейсов, клиент озона регистрируется в нём, если его там нет
+        """
+        self.publisher = publisher
+        self.state_store = state_store
+        self.metrics = metrics
+        self.registry = registry or MarketplaceRegistry()
+        self._api_client: APIClient | None = None
+        self._retry_policy: RetryPolicy | None = None
+        self._ozon = ozon
+        self._pending_states: list[_PendingState] = []
+        self._is_set_up = False
+
+    def _setup(self):
+        if self._is_set_up:
+            return
+        if self.publisher is None:
+            from google.cloud import pubsub_v1
+
+            self.publisher = EventPublisher(
+                project_id=CONFIG.PROJECT_ID,
+                batch_settings=pubsub_v1.types.BatchSettings(
+                    max_messages=CONFIG.PUBSUB_MAX_MESSAGES,
+                    max_bytes=CONFIG.PUBSUB_MAX_BYTES,
+                    max_latency=CONFIG.PUBSUB_MAX_LATENCY,
+                ),
+            )
+        if self.state_store is None:
+            self.state_store = build_state_store(CONFIG.STATE_STORE_PATH)
+        if self._ozon is None and not self.registry.supports("", MarketplacesEnum.OZON):
+            self.metrics = self.metrics or MetricsCollector()
+            self._retry_policy = RetryPolicy(budget=CONFIG.RETRY_BUDGET)
+            self._api_client = APIClient(
+                rate_limiter=TokenBucketRateLimiter(CONFIG.RATE_LIMITS),
+                retry_policy=self._retry_policy,
+                hooks=[self.metrics],
+            )
+            self._ozon = OzonApiClient(
+                api_keys=CONFIG.API_KEYS,
+                request=self._api_client,
+                token_cache=TokenCache(),
+                max_concurrency=CONFIG.ADV_CONCURRENCY,
+                seller_url=CONFIG.OZON_SELLER_URL,
+                performance_url=CONFIG.OZON_PERFORMANCE_URL,
+                product_cache=build_ttl_cache(
+                    ttl=CONFIG.PRODUCT_INFO_CACHE_TTL,
+                    max_size=CONFIG.PRODUCT_INFO_CACHE_SIZE,
+                    path=CONFIG.PRODUCT_INFO_CACHE_PATH,
+                ),
+            )
+        if self._ozon is not None:
+            ozon = self._ozon
+            self.registry.register(MarketplacesEnum.OZON, lambda: ozon)
+        self._is_set_up = True
+
+    async def __call__(self) -> dict:
+        """
+        Возвращает сводку запуска: время, итоги по продавцам, токены и метрики запросов
+        """
+        started_at = time.perf_counter()
+        summary: dict = {}
         try:
-            ozon = OzonApiClient(api_keys=CONFIG.API_KEYS, request=APIClient())
-            self.publisher = EventPublisher(project_id=CONFIG.PROJECT_ID)
-
-            amo_action_skus = await ozon.get_adv_info("amodecor")
-            so_action_skus = await ozon.get_adv_info("stroy_otdelka")
-            orion_action_skus = await ozon.get_adv_info("orion")
-
-            for product_info in amo_action_skus:
-                logger.debug(f"Processing Amo - SKU {product_info['sku']}...")
-                if not await ozon.check_stock(seller="amodecor", sku=product_info["sku"]):
-                    event = FoundZeroStockEvent(
-                        sku=product_info["sku"],
-                        legal_entity="Амодекор",
-                        adv_id=product_info["adv_id"]
-                    )
-                    logger.info(f"Товар {product_info['sku']} из Амодекора закончился, но в рекламе.")
-                    await self._reg_event(event)
-            for product_info in so_action_skus:
-                logger.debug(f"Processing SO - SKU {product_info['sku']}...")
-                if not await ozon.check_stock(seller="stroy_otdelka", sku=product_info["sku"]):
-                    event = FoundZeroStockEvent(
-                        sku=product_info["sku"],
-                        legal_entity="СтройОтделка",
-                        adv_id=product_info["adv_id"]
-                    )
-                    logger.info(f"Товар {product_info['sku']} из СтройОтделки закончился, но в рекламе.")
-                    await self._reg_event(event)
-            for product_info in orion_action_skus:
-                logger.debug(f"Processing Orion - SKU {product_info['sku']}...")
-                if not await ozon.check_stock(seller="orion", sku=product_info["sku"]):
-                    event = FoundZeroStockEvent(
-                        sku=product_info["sku"],
-                        legal_entity="Орион",
-                        adv_id=product_info["adv_id"]
-                    )
-                    logger.info(f"Товар {product_info['sku']} из Ориона закончился, но в рекламе.")
-                    await self._reg_event(event)
+            self._setup()
+            if self._retry_policy is not None:
+                self._retry_policy.reset()
+            if self.metrics is not None:
+                self.metrics.reset()
+            clients = {
+                (seller, marketplace): self.registry.get(seller, marketplace)
+                for seller, marketplace in self.registry.discover(CONFIG.API_KEYS)
+            }
+            counters = self._cache_counters()
+            summary["sellers"] = await self._check_adv_stocks(clients)
+            for name, value in self._cache_counters().items():
+                summary[name] = value - counters[name]
+            for client in self.registry.adapters():
+                if getattr(client, "product_cache", None) is not None:
+                    await asyncio.to_thread(client.product_cache.persist)
+            summary["events_published"] = len(await self.publisher.flush())
         except Exception as e:
             logger.exception(f"An error occurred: {e}")
+            summary["error"] = repr(e)
+        try:
+            await self._save_states()
+        except Exception as e:
+            logger.exception(f"Error saving state: {e}")
+            summary["state_error"] = repr(e)
+        summary["wall_time_s"] = round(time.perf_counter() - started_at, 3)
+        if self.metrics is not None:
+            summary["http"] = self.metrics.summary()
+        logger.info(f"Run summary: {json.dumps(summary, ensure_ascii=False)}")
+        return summary
+
+    async def _save_states(self):
+        """
+        Сохраняет состояние продавцов после flush: переходы, события о которых не опубликованы
+        (ошибка регистрации, публикации или таймаут flush), сохраняются с прошлыми значениями
+        """
+        pending, self._pending_states = self._pending_states, []
+        if self.state_store is None:
+            return
+        for seller_state in pending:
+            await asyncio.to_thread(self.state_store.save, seller_state.key, seller_state.published_state())
+
+    async def close(self):
+        """
+        Закрывает пул HTTP-соединений текущего event loop
+        """
+        if self._api_client is not None:
+            await self._api_client.close()
+
+    def _cache_counters(self) -> dict[str, int]:
+        """
+        Суммарные счётчики кэшей токенов и товаров созданных клиентов маркетплейсов
+        """
+        counters = dict.fromkeys(
+            ("token_fetches", "token_fetches_avoided", "product_cache_hits", "product_cache_misses"), 0
+        )
+        for client in self.registry.adapters():
+            token_cache = getattr(client, "token_cache", None)
+            if token_cache is not None:
+                counters["token_fetches"] += token_cache.fetches
+                counters["token_fetches_avoided"] += token_cache.fetches_avoided
+            product_cache = getattr(client, "product_cache", None)
+            if product_cache is not None:
+                counters["product_cache_hits"] += product_cache.hits
+                counters["product_cache_misses"] += product_cache.misses
+        return counters
+
+    async def _check_adv_stocks(self, clients: dict[tuple[str, str], AbstractMarketplaceClient]) -> dict[str, dict]:
+        """
+        Проверяет рекламируемые товары всех пар (продавец, маркетплейс) параллельно,
+        но не больше SELLER_CONCURRENCY одновременно.
+        Ошибка одной пары не прерывает проверку остальных
+
+        Returns:
+            dict: Итоги проверки {продавец: {маркетплейс: итоги}}
+        """
+        semaphore = asyncio.Semaphore(CONFIG.SELLER_CONCURRENCY)
+
+        async def check(seller: str, marketplace: str, client: AbstractMarketplaceClient) -> dict:
+            async with semaphore:
+                return await self._check_seller(
+                    client, seller, ADV_LEGAL_ENTITIES.get(seller, str(seller)), marketplace
+                )
+
+        results = await asyncio.gather(
+            *(check(seller, marketplace, client) for (seller, marketplace), client in clients.items()),
+            return_exceptions=True,
+        )
+        summary: dict[str, dict] = {}
+        for (seller, marketplace), result in zip(clients, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing seller {seller} ({marketplace}): {result!r}", exc_info=result)
+                result = {"error": repr(result)}
+            summary.setdefault(str(seller), {})[str(marketplace)] = result
+        return summary
+
+    async def _check_seller(
+            self,
+            client: AbstractMarketplaceClient,
+            seller: str,
+            legal_entity: str,
+            marketplace: str = MarketplacesEnum.OZON,
+    ) -> dict:
+        """
+        Конвейер проверки продавца: получение рекламируемых товаров и проверка остатков
+        идут параллельно через ограниченную очередь.
+        Строки (кампания, sku) группируются по sku, поэтому каждый товар проверяется один раз,
+        а событие публикуется одно на товар со всеми его кампаниями.
+        Если задано хранилище состояния, публикуются только изменения с прошлого запуска.
+        События публикуются в топики маркетплейса (ZERO_STOCK_TOPIC, BACK_IN_STOCK_TOPIC)
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=CONFIG.PIPELINE_QUEUE_SIZE)
+        adv_ids: dict[int, list[str | int]] = {}
+        stocks: dict[int, bool] = {}
+
+        async def discover():
+            async for product_info in client.iter_adv_info(seller):
+                sku_adv_ids = adv_ids.get(product_info["sku"])
+                if sku_adv_ids is None:
+                    adv_ids[product_info["sku"]] = [product_info["adv_id"]]
+                    await queue.put(product_info["sku"])
+                elif product_info["adv_id"] not in sku_adv_ids:
+                    sku_adv_ids.append(product_info["adv_id"])
+            # Конец очереди нужен только после успешного обхода: при ошибке любой из задач
+            # TaskGroup отменяет обе, а ожидание места в полной очереди без check зависло бы навсегда
+            await queue.put(None)
+
+        async def check():
+            while skus := await _next_batch(queue, PRODUCT_INFO_BATCH_SIZE):
+                logger.debug(f"Processing {seller} - {len(skus)} SKUs...")
+                stocks.update(await client.check_stocks(seller, skus))
+
+        # Состояние озона хранится под id продавца, как до появления других маркетплейсов
+        state_key = seller if marketplace == MarketplacesEnum.OZON else f"{marketplace}:{seller}"
+        previous_state = await asyncio.to_thread(self.state_store.load, state_key) if self.state_store else {}
+        async with asyncio.TaskGroup() as task_group:
+            task_group.create_task(discover())
+            task_group.create_task(check())
+
+        state = {
+            (sku, str(adv_id)): stocks[sku]
+            for sku, sku_adv_ids in adv_ids.items()
+            for adv_id in sku_adv_ids
+        }
+        pending_state = _PendingState(key=state_key, state=state, previous=previous_state)
+        out_of_stock = events_registered = 0
+        for sku, sku_adv_ids in adv_ids.items():
+            if stocks[sku]:
+                if not CONFIG.NOTIFY_BACK_IN_STOCK:
+                    continue
+                # Кампании, в которых товара не было в прошлый запуск
+                changed = [adv_id for adv_id in sku_adv_ids if previous_state.get((sku, str(adv_id))) is False]
+                if changed:
+                    logger.info(f"Товар {sku} ({legal_entity}) снова в наличии: {changed}.")
+                    handle = self._reg_event(
+                        FoundBackInStockEvent(sku=sku, legal_entity=legal_entity, adv_id=changed[0], adv_ids=changed),
+                        topic=CONFIG.BACK_IN_STOCK_TOPIC.format(marketplace=marketplace),
+                    )
+                    pending_state.events.append((handle, [(sku, str(adv_id)) for adv_id in changed]))
+                    events_registered += 1
+                continue
+
+            out_of_stock += 1
+            # Публикуем только кампании, о которых ещё не сообщали
+            changed = [adv_id for adv_id in sku_adv_ids if previous_state.get((sku, str(adv_id)), True)]
+            if changed:
+                logger.info(f"Товар {sku} ({legal_entity}) закончился, но в рекламе: {changed}.")
+                handle = self._reg_event(
+                    FoundZeroStockEvent(sku=sku, legal_entity=legal_entity, adv_id=changed[0], adv_ids=changed),
+                    topic=CONFIG.ZERO_STOCK_TOPIC.format(marketplace=marketplace),
+                )
+                pending_state.events.append((handle, [(sku, str(adv_id)) for adv_id in changed]))
+                events_registered += 1
+
+        logger.info(f"{seller} ({marketplace}): {len(adv_ids)} unique advertised SKUs, {out_of_stock} out of stock")
+        if self.state_store:
+            # Сохраняется в __call__ после flush, когда известно, какие события опубликованы
+            self._pending_states.append(pending_state)
+        return {"advertised_skus": len(adv_ids), "out_of_stock": out_of_stock, "events": events_registered}
 
-    async def _reg_event(self, event: FoundZeroStockEvent):
+    def _reg_event(self, event: Event, topic: str = "zero_stock_adv_ozon") -> Any:
+        """
+        Возвращает результат registration (future публикации) или None при ошибке
+        """
         try:
-            self.publisher.registration(
+            handle = self.publisher.registration(
                 event=event,
-                topic="zero_stock_adv_ozon",
+                topic=topic,
             )
-            logger.info(f"Event for SKU {event.sku} is published.")
+            logger.debug(f"Event for SKU {event.sku} is queued for publishing.")
+            return handle
         except Exception as e:
             logger.exception(f"Error publishing for SKU {event.sku}: {e}")
+            return None
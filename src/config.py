@@ -7,6 +7,34 @@ class Config(BaseSettings):
     SERVICE_NAME: str = "price-comparison"
 
     API_KEYS: dict = {}
+    OZON_SELLER_URL: str = "https://api-seller.ozon.ru"
+    OZON_PERFORMANCE_URL: str = "https://api-performance.ozon.ru:443"
+    # Лимиты запросов по хостам: {хост: [запросов в секунду, размер всплеска]}
+    RATE_LIMITS: dict[str, tuple[float, int]] = {}
+    # Суммарное время ожидания между повторами запросов за один запуск, в секундах
+    RETRY_BUDGET: float = 120
+    # Размер очереди между получением рекламируемых товаров и проверкой остатков
+    PIPELINE_QUEUE_SIZE: int = 5000
+    # Максимальное число одновременно проверяемых пар (продавец, маркетплейс)
+    SELLER_CONCURRENCY: int = 10
+    # Максимальное число одновременных запросов страниц рекламы одного продавца
+    ADV_CONCURRENCY: int = 10
+    # Настройки пачек публикации в Pub/Sub
+    PUBSUB_MAX_MESSAGES: int = 100
+    PUBSUB_MAX_BYTES: int = 1024 * 1024
+    PUBSUB_MAX_LATENCY: float = 0.05
+    # Хранилище состояния прошлого запуска (*.json или SQLite), пустое - публиковать всё заново
+    STATE_STORE_PATH: str = ""
+    # Публиковать ли события о возвращении товара в наличие
+    NOTIFY_BACK_IN_STOCK: bool = False
+    # Топики событий, {marketplace} заменяется на маркетплейс продавца
+    ZERO_STOCK_TOPIC: str = "zero_stock_adv_{marketplace}"
+    BACK_IN_STOCK_TOPIC: str = "back_in_stock_adv_{marketplace}"
+    # Кэш ответов /v3/product/info/list: время жизни в секундах (0 - без кэша),
+    # максимальное число товаров и JSON-файл для переиспользования между запусками
+    PRODUCT_INFO_CACHE_TTL: float = 60
+    PRODUCT_INFO_CACHE_SIZE: int = 100_000
+    PRODUCT_INFO_CACHE_PATH: str = ""
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -1,42 +1,94 @@
-import json
-import logging
-from dataclasses import asdict
+from __future__ import annotations
 
-from google.cloud import pubsub_v1
+import asyncio
+import logging
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable
 
 from src.application.interfaces.event_publisher import AbstractEventPublisher
 from src.application import events
+from src.utils.serializers import EventSerializer
+
+if TYPE_CHECKING:
+    from google.cloud import pubsub_v1
 
 
 class EventPublisher(AbstractEventPublisher):
+    """
+    Публикация событий в Pub/Sub
+
+    Публикация не блокирует event loop: registration возвращает future,
+    сообщения копятся в пачки по batch_settings, а flush дожидается отправки всех накопленных.
+    События кодируются serializer (по умолчанию компактный JSON)
+    """
+
     def __init__(
         self,
         project_id: str,
+        batch_settings: pubsub_v1.types.BatchSettings | None = None,
+        serializer: Callable[[events.Event], bytes] | None = None,
     ):
-        self.publisher = self._build_publisher()
         self.project_id = project_id
+        self.batch_settings = batch_settings
+        self.serializer = serializer or EventSerializer()
+        self.publisher = self._build_publisher(batch_settings)
+        self._pending: list[Future] = []
 
     def __getstate__(self):
-        return {"project_id": self.project_id}
+        return {
+            "project_id": self.project_id,
+            "batch_settings": self.batch_settings,
+            "serializer": self.serializer,
+        }
 
     def __setstate__(self, state):
         self.project_id = state["project_id"]
-        self.publisher = self._build_publisher()
+        self.batch_settings = state.get("batch_settings")
+        self.serializer = state.get("serializer") or EventSerializer()
+        self.publisher = self._build_publisher(self.batch_settings)
+        self._pending = []
 
     @staticmethod
-    def _build_publisher() -> pubsub_v1.PublisherClient:
+    def _build_publisher(
+        batch_settings: pubsub_v1.types.BatchSettings | None = None,
+    ) -> pubsub_v1.PublisherClient:
+        from google.cloud import pubsub_v1
+
         # credential = credentials.Credentials.from_authorized_user_file(
         #     filename, scopes=["https://www.googleapis.com/auth/pubsub"]
         # )
-        return pubsub_v1.PublisherClient()  # credential=credential)
+        if batch_settings is None:
+            return pubsub_v1.PublisherClient()  # credential=credential)
+        return pubsub_v1.PublisherClient(batch_settings=batch_settings)
 
-    def _registration(self, event: events.Event, topic: str, **kwargs) -> str:
+    def _registration(self, event: events.Event, topic: str, **kwargs) -> Future | None:
         try:
             topic_path = self.publisher.topic_path(self.project_id, topic)
-            encode_event_event = json.dumps(asdict(event), indent=2).encode("utf-8")  # noqa
-            logging.info(f"publish - {encode_event_event}")
+            encode_event_event = self.serializer(event)
+            logging.debug("publish - %s", encode_event_event)
             res = self.publisher.publish(topic=topic_path, data=encode_event_event, **kwargs)
-            id = res.result(timeout=30)
-            return id
+            self._pending.append(res)
+            return res
         except Exception as exc:
-            logging.error(f"Error registration event: {exc}")
\ No newline at end of file
+            logging.error(f"Error registration event: {exc}")
+
+    async def flush(self, timeout: float = 30) -> list[str]:
+        """
+        Дожидается публикации всех накопленных событий
+
+        Возвращает id опубликованных сообщений, ошибки публикации логируются
+        """
+        pending, self._pending = self._pending, []
+        if not pending:
+            return []
+        results = await asyncio.wait_for(
+            asyncio.gather(*(asyncio.wrap_future(future) for future in pending), return_exceptions=True),
+            timeout=timeout,
+        )
+        ids = []
+        for result in results:
+            if isinstance(result, Exception):
+                logging.error(f"Error registration event: {result}")
+            else:
+                ids.append(result)
+        return ids
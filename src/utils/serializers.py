@@ -0,0 +1,36 @@
+import json
+from dataclasses import fields
+from functools import cache, partial
+from typing import Any, Callable
+
+from src.application import events
+
+
+@cache
+def _field_names(event_type: type) -> tuple[str, ...]:
+    return tuple(field.name for field in fields(event_type))
+
+
+def event_to_dict(event: events.Event) -> dict[str, Any]:
+    """
+    Неглубокое преобразование события в словарь, без копирования вложенных значений как в asdict
+    """
+    return {name: getattr(event, name) for name in _field_names(type(event))}
+
+
+class EventSerializer:
+    """
+    Кодирует события в компактный JSON (без отступов и с неэкранированной кириллицей)
+
+    Функцию кодирования можно заменить более быстрой, например EventSerializer(dumps=orjson.dumps)
+    """
+
+    def __init__(self, dumps: Callable[[Any], str | bytes] | None = None):
+        """
+        :param dumps: Функция кодирования словаря в JSON, возвращающая str или bytes
+        """
+        self._dumps = dumps or partial(json.dumps, ensure_ascii=False, separators=(",", ":"))
+
+    def __call__(self, event: events.Event) -> bytes:
+        data = self._dumps(event_to_dict(event))
+        return data if isinstance(data, bytes) else data.encode("utf-8")
@@ -0,0 +1,78 @@
+"""
+Ограничение частоты APIClient вместе с лимитом соединений на хост на локальном aiohttp-сервере
+
+Запросы, ждущие свободного слота соединения, не должны заранее тратить токены:
+когда все слоты освобождаются разом, сервер видит не больше запросов, чем позволяет token bucket
+"""
+import asyncio
+import socket
+import time
+
+from aiohttp import web
+
+from src.adapters.api_client import APIClient
+from src.adapters.rate_limiter import TokenBucketRateLimiter
+
+HOST = "127.0.0.1"
+RATE = 5
+BURST = 5
+CONNECTIONS = 10
+REQUESTS = 30
+# Первые CONNECTIONS запросов держат все слоты до этого момента и завершаются одновременно
+RELEASE_AT = 3.0
+# Допуск на неточность таймеров event loop, в токенах
+TOLERANCE = 0.5
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def bucket_violations(arrivals: list[float]) -> list[float]:
+    """
+    Возвращает моменты прихода запросов, на которые у token bucket сервера (RATE, BURST) не хватило токена
+    """
+    tokens, updated_at, violations = float(BURST), arrivals[0], []
+    for arrived_at in sorted(arrivals):
+        tokens = min(BURST, tokens + (arrived_at - updated_at) * RATE)
+        updated_at = arrived_at
+        if tokens < 1 - TOLERANCE:
+            violations.append(arrived_at)
+        tokens -= 1
+    return violations
+
+
+def test_queued_requests_do_not_burst_past_rate_limit():
+    async def run() -> list[float]:
+        arrivals: list[float] = []
+        started_at = time.monotonic()
+
+        async def handler(request: web.Request) -> web.Response:
+            arrivals.append(time.monotonic() - started_at)
+            if len(arrivals) <= CONNECTIONS:
+                await asyncio.sleep(max(0.0, RELEASE_AT - (time.monotonic() - started_at)))
+            return web.json_response({})
+
+        app = web.Application()
+        app.router.add_get("/", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        port = free_port()
+        await web.TCPSite(runner, HOST, port).start()
+        client = APIClient(
+            host_limits={HOST: CONNECTIONS},
+            rate_limiter=TokenBucketRateLimiter({HOST: (RATE, BURST)}),
+        )
+        try:
+            await asyncio.gather(*(client.get(f"http://{HOST}:{port}/") for _ in range(REQUESTS)))
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return arrivals
+
+    arrivals = asyncio.run(run())
+
+    assert len(arrivals) == REQUESTS
+    assert bucket_violations(arrivals) == []
@@ -0,0 +1,75 @@
+"""
+Остановка merge_async_iterators: при раннем выходе потребителя, его отмене и ошибке источника
+фоновая задача обхода должна завершаться, даже если очередь заполнена
+"""
+import asyncio
+from contextlib import aclosing
+from typing import AsyncIterator
+
+import pytest
+
+from src.adapters.marketplaces.ozon import merge_async_iterators
+
+TIMEOUT = 5
+
+
+async def numbers(count: int) -> AsyncIterator[int]:
+    for number in range(count):
+        await asyncio.sleep(0)
+        yield number
+
+
+async def failing(after: int) -> AsyncIterator[int]:
+    async for number in numbers(after):
+        yield number
+    raise RuntimeError("stub source error")
+
+
+async def other_tasks() -> set[asyncio.Task]:
+    # Даём отменённым задачам отработать, чтобы остались только зависшие
+    for _ in range(10):
+        await asyncio.sleep(0)
+    return asyncio.all_tasks() - {asyncio.current_task()}
+
+
+def test_early_exit_with_full_queue_stops_producer():
+    async def consume() -> set[asyncio.Task]:
+        merged = merge_async_iterators([numbers(100), numbers(100)], maxsize=2)
+        async with asyncio.timeout(TIMEOUT), aclosing(merged):
+            async for _ in merged:
+                # Источники успевают заполнить очередь до выхода
+                await asyncio.sleep(0.01)
+                break
+        return await other_tasks()
+
+    assert asyncio.run(consume()) == set()
+
+
+def test_cancelled_consumer_stops_producer():
+    async def consume(started: asyncio.Event):
+        async for _ in merge_async_iterators([numbers(100), numbers(100)], maxsize=2):
+            started.set()
+            await asyncio.sleep(10)
+
+    async def cancel_consumer() -> set[asyncio.Task]:
+        async with asyncio.timeout(TIMEOUT):
+            started = asyncio.Event()
+            consumer = asyncio.create_task(consume(started))
+            await started.wait()
+            await asyncio.sleep(0.01)
+            consumer.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await consumer
+            return await other_tasks()
+
+    assert asyncio.run(cancel_consumer()) == set()
+
+
+def test_source_error_with_full_queue_reaches_consumer():
+    async def consume():
+        async with asyncio.timeout(TIMEOUT):
+            async for _ in merge_async_iterators([numbers(100), failing(3)], maxsize=2):
+                await asyncio.sleep(0.01)
+
+    with pytest.raises(RuntimeError, match="stub source error"):
+        asyncio.run(consume())
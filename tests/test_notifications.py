@@ -0,0 +1,69 @@
+"""
+Пакетная проверка порогов уведомлений должна совпадать с проверкой по одному товару
+"""
+import random
+from datetime import datetime, timedelta
+
+from src.application.model import (
+    NOTIFICATION_SALES_PERIOD, Notification, Product, ProductStatus, Sale, SalesPeriod, Sku,
+)
+
+PRODUCTS = 2_000
+STATUSES = [ProductStatus.ORDINARY, ProductStatus.NEW, ProductStatus.ABSOLUTE_NEW]
+SENT_STATUSES = ["", "sent_12", "sent_6", "sent_3"]
+
+
+def build_items(now: datetime, seed: int = 0) -> list[tuple[Notification, Product]]:
+    rnd = random.Random(seed)
+    items = []
+    for index in range(PRODUCTS):
+        sku = Sku(id=index, vendor_code=f"V-{index}", sku=str(100_000_000 + index), marketplace="ozon")
+        # Доля дней в наличии разная, чтобы встретились все случаи отчёта о продажах
+        in_stock_rate = rnd.random()
+        sales = [
+            Sale(
+                quantity=rnd.randint(0, 5),
+                date=(now - timedelta(days=day)).replace(hour=0, minute=0, second=0, microsecond=0),
+                product_id=index,
+                in_stock=int(rnd.random() < in_stock_rate),
+            )
+            for day in range(rnd.randint(0, 3 * NOTIFICATION_SALES_PERIOD))
+        ]
+        product = Product(
+            id=index,
+            sku=sku,
+            name=f"Товар {index}",
+            url="",
+            seller="amodecor",
+            stock_fbo=rnd.randint(0, 40),
+            stock_fbs=rnd.randint(0, 20),
+            sales=sales,
+            _status=rnd.choice(STATUSES).value,
+            pre_replenishment_inventory=rnd.randint(0, 500),
+        )
+        items.append((Notification(rnd.choice(SENT_STATUSES), sku), product))
+    return items
+
+
+def test_sales_period_matches_report():
+    now = datetime.utcnow()
+    period = SalesPeriod.ending_at(NOTIFICATION_SALES_PERIOD, now)
+    for _, product in build_items(now):
+        report = product.get_sales_and_availability_by_period(days=NOTIFICATION_SALES_PERIOD, now=now)
+        assert period.sales_quantity(product.sales_history) == report.sales_quantity
+
+
+def test_batch_matches_one_by_one():
+    now = datetime.utcnow()
+    one_by_one = build_items(now)
+    for notification, product in one_by_one:
+        notification.check_and_send_notification(product)
+    batch = build_items(now)
+
+    Notification.check_and_send_notifications(batch, now=now)
+
+    for (expected, _), (notification, _) in zip(one_by_one, batch):
+        assert notification.status == expected.status
+        assert [event.data["notification"] for event in notification.events] == [
+            event.data["notification"] for event in expected.events
+        ]
@@ -0,0 +1,179 @@
+"""
+Отказы конвейера OzonAdvInfoUseCase на заглушке клиента маркетплейса, без сети
+
+- check_stocks одного продавца падает, пока очередь PIPELINE_QUEUE_SIZE заполнена:
+  запуск должен завершиться, ошибка - остаться в итогах этого продавца, остальные - проверены
+- публикация событий не удалась: переходы не попадают в сохранённое состояние,
+  и следующий запуск отправляет события снова
+- /v3/product/info/list продавца отвечает ошибкой, пока очередь страниц рекламы заполнена:
+  повторные запуски на одном event loop не оставляют зависших задач обхода страниц
+"""
+import asyncio
+import json
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Iterable
+
+import pytest
+
+from src.adapters.exceptions import APIStatusError
+from src.adapters.marketplaces.ozon import ADV_PAGE_SIZE, ADV_PAGES_QUEUE_SIZE, OzonApiClient
+from src.adapters.marketplaces.registry import MarketplaceRegistry
+from src.application.interfaces.api_client import AbstractApiClient, AbstractMarketplaceClient
+from src.application.interfaces.event_publisher import AbstractEventPublisher
+from src.application.interfaces.state_store import AbstractStateStore, AdvState
+from src.application.schema import MarketplacesEnum
+from src.application.usecase import OzonAdvInfoUseCase
+from src.config import config as CONFIG
+
+FAILING_SELLER = "amodecor"
+HEALTHY_SELLER = "orion"
+SKUS = 20_000
+TIMEOUT = 10
+
+
+class StubClient(AbstractMarketplaceClient):
+    def __init__(self, failing_sellers: set[str]):
+        self.failing_sellers = failing_sellers
+
+    async def iter_adv_info(self, seller: str, **kwargs: Any) -> AsyncIterator[dict]:
+        for sku in range(1, SKUS + 1):
+            if sku % 1000 == 0:
+                await asyncio.sleep(0)
+            yield {"sku": sku, "adv_id": "1"}
+
+    async def check_stocks(self, seller: str, skus: Iterable[int]) -> dict[int, bool]:
+        await asyncio.sleep(0.01)
+        if seller in self.failing_sellers:
+            raise APIStatusError("http://stub/v3/product/info/list", 500, "stub error")
+        return {sku: sku % 10 != 0 for sku in skus}
+
+
+class StubOzonApi(AbstractApiClient):
+    """
+    Performance API с CAMPAIGNS кампаниями по ADV_PAGES страниц и Seller API,
+    у которого /v3/product/info/list всегда отвечает 400
+    """
+    CAMPAIGNS = 3
+    ADV_PAGES = ADV_PAGES_QUEUE_SIZE
+
+    async def get(self, url: str, **kwargs: Any) -> dict | None:
+        await asyncio.sleep(0)
+        if url.endswith("/api/client/campaign"):
+            return {"list": [{"id": campaign_id} for campaign_id in range(1, self.CAMPAIGNS + 1)]}
+        campaign_id = int(url.split("/")[-3])
+        page = kwargs["params"]["page"]
+        first_sku = (campaign_id * self.ADV_PAGES + page) * ADV_PAGE_SIZE
+        data = {
+            "products": [{"sku": str(sku)} for sku in range(first_sku, first_sku + ADV_PAGE_SIZE)],
+            "total": str(self.ADV_PAGES * ADV_PAGE_SIZE),
+        }
+        return kwargs["parser"](json.dumps(data).encode())
+
+    async def post(self, url: str, **kwargs: Any) -> dict | None:
+        await asyncio.sleep(0)
+        if url.endswith("/api/client/token"):
+            return {"access_token": "token", "expires_in": 3600}
+        if url.endswith("/v3/product/info/list"):
+            await asyncio.sleep(0.01)
+            raise APIStatusError(url, 400, "stub error")
+        return {"products": []}
+
+    async def patch(self, url: str, **kwargs: Any) -> dict | None:
+        raise NotImplementedError
+
+
+class InMemoryEventPublisher(AbstractEventPublisher):
+    def __init__(self, failing: bool = False):
+        self.events = []
+        self.failing = failing
+
+    def _registration(self, event, topic, **kwargs):
+        self.events.append((topic, event))
+        future = Future()
+        if self.failing:
+            future.set_exception(RuntimeError("stub publish error"))
+        else:
+            future.set_result(str(len(self.events)))
+        return future
+
+    async def flush(self, timeout: float = 30) -> list[str]:
+        return []
+
+
+class InMemoryStateStore(AbstractStateStore):
+    def __init__(self):
+        self.states: dict[str, AdvState] = {}
+
+    def load(self, seller: str) -> AdvState:
+        return dict(self.states.get(seller, {}))
+
+    def save(self, seller: str, state: AdvState) -> None:
+        self.states[seller] = dict(state)
+
+
+def build_use_case(
+        client: AbstractMarketplaceClient, publisher: AbstractEventPublisher, state_store: AbstractStateStore,
+) -> OzonAdvInfoUseCase:
+    registry = MarketplaceRegistry()
+    registry.register(MarketplacesEnum.OZON, lambda: client)
+    return OzonAdvInfoUseCase(publisher=publisher, registry=registry, state_store=state_store)
+
+
+def test_failing_check_stocks_does_not_block_run(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(CONFIG, "API_KEYS", {
+        FAILING_SELLER: {"ozon": {"stub": True}},
+        HEALTHY_SELLER: {"ozon": {"stub": True}},
+    })
+    monkeypatch.setattr(CONFIG, "PIPELINE_QUEUE_SIZE", 500)
+    use_case = build_use_case(StubClient({FAILING_SELLER}), InMemoryEventPublisher(), InMemoryStateStore())
+
+    summary = asyncio.run(asyncio.wait_for(use_case(), TIMEOUT))
+
+    sellers = summary["sellers"]
+    assert "error" in sellers[FAILING_SELLER]["ozon"]
+    assert sellers[HEALTHY_SELLER]["ozon"]["advertised_skus"] == SKUS
+
+
+def test_unpublished_transitions_are_retried(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(CONFIG, "API_KEYS", {HEALTHY_SELLER: {"ozon": {"stub": True}}})
+    publisher = InMemoryEventPublisher(failing=True)
+    state_store = InMemoryStateStore()
+    use_case = build_use_case(StubClient(set()), publisher, state_store)
+
+    async def run_twice() -> int:
+        await asyncio.wait_for(use_case(), TIMEOUT)
+        first_events = len(publisher.events)
+        assert first_events
+        assert not any(in_stock is False for in_stock in state_store.states[HEALTHY_SELLER].values())
+
+        publisher.failing = False
+        await asyncio.wait_for(use_case(), TIMEOUT)
+        return first_events
+
+    first_events = asyncio.run(run_twice())
+
+    assert len(publisher.events) == 2 * first_events
+    assert sum(in_stock is False for in_stock in state_store.states[HEALTHY_SELLER].values()) == first_events
+
+
+def test_failing_product_info_leaves_no_adv_page_tasks(monkeypatch: pytest.MonkeyPatch):
+    api_keys = {FAILING_SELLER: {"ozon": {
+        "client_id": "1", "api_key": "key", "client_adv_id": "adv", "client_adv_secret": "secret",
+    }}}
+    monkeypatch.setattr(CONFIG, "API_KEYS", api_keys)
+    # Обход рекламы останавливается на заполненной очереди конвейера, страницы копятся в очереди рекламы
+    monkeypatch.setattr(CONFIG, "PIPELINE_QUEUE_SIZE", ADV_PAGE_SIZE)
+    client = OzonApiClient(request=StubOzonApi(), api_keys=api_keys)
+    use_case = build_use_case(client, InMemoryEventPublisher(), InMemoryStateStore())
+
+    async def run_on_warm_loop() -> list[asyncio.Task]:
+        async with asyncio.timeout(TIMEOUT):
+            for _ in range(3):
+                summary = await use_case()
+                assert "error" in summary["sellers"][FAILING_SELLER]["ozon"]
+            # Отменённым задачам и закрытию генераторов нужно несколько итераций цикла
+            for _ in range(10):
+                await asyncio.sleep(0)
+            return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(run_on_warm_loop()) == []